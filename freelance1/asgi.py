@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'freelance1.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from tasks.streaming import EVENTS_STREAM_PATH, sse_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Поток событий держит соединение открытым, поэтому обслуживается
+    # отдельным ASGI-приложением, а не синхронными DRF-вью.
+    if scope['type'] == 'http' and scope['path'] == EVENTS_STREAM_PATH:
+        return await sse_app(scope, receive, send)
+    return await django_application(scope, receive, send)
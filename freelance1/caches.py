@@ -0,0 +1,25 @@
+"""Кэш, общий для всех процессов приложения.
+
+Данные, которые должны видеть все воркеры (отзыв токенов, прилипание
+к primary, профиль /me), лежат в кэше settings.SHARED_CACHE.
+LocMemCache живёт в одном процессе, а DummyCache ничего не хранит,
+поэтому такие бэкенды для него не годятся.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def shared_cache(purpose):
+    """Кэш SHARED_CACHE; ImproperlyConfigured, если он локален процессу."""
+    cache = caches[settings.SHARED_CACHE]
+    if isinstance(cache, LOCAL_BACKENDS):
+        raise ImproperlyConfigured(
+            f'{purpose} needs a cache shared between processes, but '
+            f'CACHES[{settings.SHARED_CACHE!r}] is '
+            f'{type(cache).__name__}.')
+    return cache
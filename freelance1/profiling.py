@@ -0,0 +1,257 @@
+"""Профилирование запросов к API и метрики в формате Prometheus.
+
+ProfilingMiddleware включается настройкой PROFILING. Для каждого запроса
+она считает SQL-запросы и их время (execute_wrapper на всех
+соединениях), время сериализации без SQL внутри неё, размер ответа и
+полное время. Значения копятся в скользящих гистограммах за
+PROFILING_WINDOW секунд по паре (маршрут, вью.действие) и отдаются
+администраторам на /metrics/. Превышение PROFILING_QUERY_BUDGET
+пишется в лог предупреждением.
+
+Гистограммы живут в памяти процесса: каждый воркер отдаёт свои.
+Async-вью выполняют загрузку в другом потоке, и их SQL сюда не попадает.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework import serializers
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from jobs.queue import metrics as job_metrics
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'freelance'
+METRICS = (
+    ('request_duration_seconds', 'Wall time of the request.',
+     (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)),
+    ('request_queries', 'SQL queries issued by the request.',
+     (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)),
+    ('request_sql_seconds', 'Time spent in SQL.',
+     (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)),
+    ('request_serializer_seconds', 'Time spent in serializer .data '
+                                   'excluding SQL.',
+     (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5)),
+    ('response_bytes', 'Size of the response body.',
+     (256, 1024, 4096, 16384, 65536, 262144, 1048576)),
+)
+
+_state = threading.local()
+
+
+class RollingHistogram:
+    """Гистограмма за последние `window` секунд из `slots` корзин времени."""
+
+    def __init__(self, buckets, window, slots=10):
+        self.buckets = buckets
+        self.width = window / slots
+        self.slots = slots
+        self.data = {}
+
+    def observe(self, value, now):
+        slot = int(now // self.width)
+        counts = self.data.get(slot)
+        if counts is None:
+            self.prune(slot)
+            counts = self.data[slot] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def prune(self, slot):
+        for old in [old for old in self.data if old <= slot - self.slots]:
+            del self.data[old]
+
+    def snapshot(self, now):
+        """(накопленные счётчики по границам, сумма, количество)."""
+        self.prune(int(now // self.width))
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for slot in self.data.values():
+            for index in range(len(counts)):
+                counts[index] += slot[index]
+            total += slot[-1]
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = defaultdict(lambda: {
+            name: RollingHistogram(buckets, settings.PROFILING_WINDOW)
+            for name, _, buckets in METRICS})
+
+    def observe(self, labels, values):
+        now = time.monotonic()
+        with self.lock:
+            histograms = self.histograms[labels]
+            for name, value in values.items():
+                histograms[name].observe(value, now)
+
+    def render(self):
+        now = time.monotonic()
+        lines = []
+        with self.lock:
+            items = sorted(self.histograms.items())
+            for name, help_text, buckets in METRICS:
+                metric = f'{PREFIX}_{name}'
+                lines += [f'# HELP {metric} {help_text}',
+                          f'# TYPE {metric} histogram']
+                for (route, view), histograms in items:
+                    counts, total, count = histograms[name].snapshot(now)
+                    if not count:
+                        continue
+                    labels = (f'route="{escape(route)}",'
+                              f'view="{escape(view)}"')
+                    for bound, cumulative in zip(
+                            [*map(str, buckets), '+Inf'], counts):
+                        lines.append(f'{metric}_bucket{{{labels},'
+                                     f'le="{bound}"}} {cumulative}')
+                    lines += [f'{metric}_sum{{{labels}}} {total}',
+                              f'{metric}_count{{{labels}}} {count}']
+        return lines
+
+
+registry = Registry()
+
+
+def escape(value):
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+class Profile:
+    __slots__ = ('queries', 'sql_time', 'serializer_time', 'serializing',
+                 'labels')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.labels = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def timed_data(prop):
+    def data(self):
+        profile = getattr(_state, 'profile', None)
+        if profile is None or profile.serializing:
+            return prop.fget(self)
+        profile.serializing = True
+        started = time.perf_counter()
+        sql_time = profile.sql_time
+        try:
+            return prop.fget(self)
+        finally:
+            profile.serializing = False
+            profile.serializer_time += (time.perf_counter() - started
+                                        - (profile.sql_time - sql_time))
+    data.profiled = True
+    return property(data)
+
+
+def instrument_serializers():
+    """Оборачивает .data сериализаторов DRF замером времени."""
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, 'profiled', False):
+            cls.data = timed_data(cls.data)
+
+
+def view_label(view_func, method):
+    """'TasksViewSet.list', 'RespondViewSet.winner', 'module.function'."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        profile = _state.profile = Profile()
+        # То же, что connection.execute_wrapper(), без контекст-менеджеров
+        # на каждый запрос.
+        wrappers = [connection.execute_wrappers
+                    for connection in connections.all()]
+        for stack in wrappers:
+            stack.append(profile.record_query)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            for stack in wrappers:
+                stack.pop()
+            _state.profile = None
+        if profile.labels is None:
+            return response
+        values = {
+            'request_duration_seconds': time.perf_counter() - started,
+            'request_queries': profile.queries,
+            'request_sql_seconds': profile.sql_time,
+            'request_serializer_seconds': profile.serializer_time,
+        }
+        if not response.streaming:
+            values['response_bytes'] = len(response.content)
+        registry.observe(profile.labels, values)
+        if profile.queries > settings.PROFILING_QUERY_BUDGET:
+            logger.warning('%s %s issued %d SQL queries (budget %d)',
+                           request.method, request.path, profile.queries,
+                           settings.PROFILING_QUERY_BUDGET)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(_state, 'profile', None)
+        if profile is not None:
+            profile.labels = (request.resolver_match.view_name,
+                              view_label(view_func, request.method))
+
+
+class MetricsView(APIView):
+    """Гистограммы профилирования и очередь задач в формате Prometheus."""
+    permission_classes = (IsAdminUser,)
+
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        lines = registry.render()
+        jobs = job_metrics()
+        lines += [f'# TYPE {PREFIX}_jobs gauge']
+        lines += [f'{PREFIX}_jobs{{status="{status}"}} {count}'
+                  for status, count in jobs['depth'].items()]
+        for name in ('ready', 'oldest_ready_age', 'wait_avg', 'wait_max',
+                     'run_avg'):
+            suffix = '' if name == 'ready' else '_seconds'
+            lines += [f'# TYPE {PREFIX}_jobs_{name}{suffix} gauge',
+                      f'{PREFIX}_jobs_{name}{suffix} {jobs[name]}']
+        return HttpResponse('\n'.join(lines) + '\n',
+                            content_type='text/plain; version=0.0.4')
@@ -0,0 +1,129 @@
+"""Чтение с реплик БД для безопасных запросов к API.
+
+ReplicaMiddleware выбирает для запроса с безопасным методом одну из
+REPLICA_DATABASES, и ReplicaRouter отправляет туда чтения этого
+запроса. Запись, изменяющие запросы, management-команды, воркер очереди
+и любые чтения внутри transaction.atomic() на default (проверки и
+движения балансов) идут на primary.
+
+Read-your-writes: после успешного изменяющего запроса чтения этого
+пользователя ещё REPLICA_STICKY_SECONDS идут на primary. Отметка лежит
+в общем кэше (freelance1.caches), так что её видят все воркеры; с
+кэшем, локальным для процесса, middleware не запускается. Пользователь
+берётся из Bearer-токена или сессии ещё до вью, без запросов к БД.
+
+Потоковые ответы (выгрузки) дочитываются уже после middleware и читают
+с primary.
+
+Реплики SQLite для локальной разработки и тестов копирует командой
+sync_replica функция copy_database.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from freelance1.caches import shared_cache
+
+PIN_KEY = 'replicas:pin:{}'
+
+# Алиас реплики текущего запроса; None - читать с primary.
+_replica = ContextVar('replica', default=None)
+_authentication = JWTAuthentication()
+
+
+@contextmanager
+def use_primary():
+    """Чтения внутри блока идут на primary даже в безопасном запросе."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def pin(user_id):
+    shared_cache('REPLICA_DATABASES').set(PIN_KEY.format(user_id), True,
+              settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and shared_cache('REPLICA_DATABASES').get(
+        PIN_KEY.format(user_id), False)
+
+
+def request_user_id(request):
+    """id пользователя из Bearer-токена или сессии; None - аноним."""
+    header = _authentication.get_header(request)
+    raw_token = header and _authentication.get_raw_token(header)
+    if raw_token:
+        try:
+            return _authentication.get_validated_token(raw_token)[
+                api_settings.USER_ID_CLAIM]
+        except (InvalidToken, KeyError):
+            return None
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и на primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed()
+        # Отметка в кэше одного процесса не дойдёт до других воркеров.
+        shared_cache('REPLICA_DATABASES')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user_id = request_user_id(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if user_id is not None and response.status_code < 400:
+                pin(user_id)
+            return response
+        if is_pinned(user_id):
+            return self.get_response(request)
+        token = _replica.set(random.choice(settings.REPLICA_DATABASES))
+        try:
+            return self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+
+def copy_database(source, target):
+    """Копирует SQLite-базу source в target через backup API.
+
+    Замена настоящей репликации: target целиком перезаписывается
+    снимком source на момент копирования.
+    """
+    for wrapper in (source, target):
+        if wrapper.vendor != 'sqlite':
+            raise ValueError(f'{wrapper.alias} is not an SQLite database')
+        wrapper.ensure_connection()
+    source.connection.backup(target.connection)
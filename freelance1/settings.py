@@ -29,14 +29,17 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'tasks',
     'users',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'freelance1.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'freelance1.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,12 +69,45 @@ WSGI_APPLICATION = 'freelance1.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Прагмы на каждое новое соединение SQLite (freelance1.sqlite). WAL
+# пускает читателей параллельно с писателем, и с ним synchronous=NORMAL
+# не теряет целостность, только последние транзакции при сбое питания.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # мс ожидания чужой блокировки
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,  # КБ
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'freelance1.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Соединение живёт между запросами: прагмы не выполняются заново.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'pragmas': SQLITE_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Копия default для чтений, её обновляет команда sync_replica.
+    'replica': {
+        'ENGINE': 'freelance1.sqlite',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'pragmas': SQLITE_PRAGMAS},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
+DATABASE_ROUTERS = ['freelance1.replicas.ReplicaRouter']
+
+# Реплики, с которых читают безопасные запросы API (freelance1.replicas),
+# например ['replica']; пустой список - всё читается с default. После
+# своих изменений пользователь читает с default ещё столько секунд.
+REPLICA_DATABASES = []
+REPLICA_STICKY_SECONDS = 10
 
 
 # Password validation
@@ -117,7 +153,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -128,14 +164,55 @@ REST_FRAMEWORK = {
 }
 
 SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
+    # Claims access-токена устаревают не дольше чем за этот срок;
+    # новый токен с claims из БД выдаёт users/v1/auth/token/refresh/.
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
 }
+# Брать пользователя из claims токена, не читая его из БД.
+JWT_CLAIMS_USER = True
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'freelance1',
+    },
+    # Общий для процессов одной машины; для нескольких серверов -
+    # Redis или Memcached.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        # Вытеснение при переполнении стёрло бы отметки отзыва токенов.
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+}
+# Алиас кэша для отметок, которые видят все воркеры (freelance1.caches).
+SHARED_CACHE = 'shared'
+ME_CACHE_TIMEOUT = 300
+
+# Брокер ленты событий; tasks.events.CacheBroker - для нескольких процессов
+# с общим кэшем.
+EVENTS_BACKEND = {
+    'BACKEND': 'tasks.events.InMemoryBroker',
+}
+SSE_KEEPALIVE = 15
+LONG_POLL_TIMEOUT = 25
 
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 NOREPLY_FREELANCE1_EMAIL = 'noreply@freelance1.app'
 
+# Очередь фоновых задач: задержки повторов и аренда задачи воркером, сек.
+JOBS_RETRY_BASE = 10
+JOBS_RETRY_MAX = 3600
+JOBS_LEASE = 300
+
+# Профилирование запросов к API (freelance1.profiling): окно гистограмм,
+# сек, и число SQL-запросов, после которого пишется предупреждение.
+PROFILING = False
+PROFILING_WINDOW = 300
+PROFILING_QUERY_BUDGET = 20
+
 AUTH_USER_MODEL = 'users.User'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
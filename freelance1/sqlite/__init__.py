@@ -0,0 +1,17 @@
+"""SQLite-бэкенд с прагмами на каждое соединение и BEGIN IMMEDIATE.
+
+Подключается как ENGINE 'freelance1.sqlite'. Дополнительно к обычным
+параметрам sqlite3.connect в OPTIONS понимает:
+
+- pragmas: {имя: значение}, выполняются на каждом новом соединении
+  (WAL, busy_timeout, synchronous и т.д., см. SQLITE_PRAGMAS в settings);
+- transaction_mode: DEFERRED, IMMEDIATE или EXCLUSIVE - чем atomic()
+  начинает транзакцию, как в OPTIONS Django 5.1.
+
+С обычным BEGIN транзакция сначала читает, а на первой записи пытается
+взять блокировку на запись. Если её уже держит другое соединение,
+SQLite отвечает "database is locked" сразу, не дожидаясь busy_timeout:
+иначе две транзакции ждали бы друг друга. BEGIN IMMEDIATE берёт
+блокировку в начале транзакции, и конкурирующие запросы просто ждут
+своей очереди.
+"""
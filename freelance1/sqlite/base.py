@@ -0,0 +1,37 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        mode = options.get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'settings.DATABASES[{self.alias!r}]["OPTIONS"]'
+                f'["transaction_mode"] must be one of '
+                f'{", ".join(TRANSACTION_MODES)}, not {mode!r}.')
+        self.pragmas = options.get('pragmas') or {}
+        self.transaction_mode = mode and mode.upper()
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        # Вне транзакции: journal_mode и synchronous внутри неё не меняются.
+        cursor = self.connection.cursor()
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -5,6 +5,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from .profiling import MetricsView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Freelance",
@@ -22,4 +24,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('tasks/', include('tasks.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
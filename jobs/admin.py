@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at',
+                    'created', 'finished')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created', 'started', 'finished', 'locked_at',
+                       'locked_by', 'last_error')
+
+
+admin.site.register(Job, JobAdmin)
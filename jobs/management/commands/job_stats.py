@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import metrics
+
+
+class Command(BaseCommand):
+    help = 'Глубина очереди фоновых задач и задержки их выполнения.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(metrics(), indent=2))
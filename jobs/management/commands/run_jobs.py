@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from jobs.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры очереди фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Пауза, когда очередь пуста (секунды).')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти.')
+
+    def handle(self, *args, **options):
+        if options['workers'] == 1:
+            return self.work(options['sleep'], options['once'])
+        # Дочерние процессы не должны наследовать открытые соединения.
+        connections.close_all()
+        processes = [multiprocessing.Process(
+            target=self.work, args=(options['sleep'], options['once']))
+            for _ in range(options['workers'])]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+    def work(self, sleep, once):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        try:
+            while True:
+                done = run_pending(worker)
+                if done:
+                    self.stdout.write(f'{worker}: {done} jobs done')
+                if once:
+                    return
+                if not done:
+                    close_old_connections()
+                    time.sleep(sleep)
+        except KeyboardInterrupt:
+            pass
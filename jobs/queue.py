@@ -0,0 +1,148 @@
+"""Очередь фоновых задач в таблице Job.
+
+enqueue() пишет задачу в той же транзакции, что и вызывающий код, и
+сразу возвращается; воркеры (manage.py run_jobs) забирают готовые
+задачи условным UPDATE, так что одну задачу выполняет один воркер.
+Упавшая задача повторяется с экспоненциальной задержкой, после
+max_attempts попыток остаётся в статусе failed. Задача, воркер которой
+умер, возвращается в работу по истечении JOBS_LEASE.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .models import Job, JobStatuses
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def handler(name):
+    """Регистрирует функцию-обработчик задач `name`."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, delay=0, max_attempts=None, **payload):
+    if name not in _handlers:
+        raise KeyError(f'Unknown job {name}')
+    job = Job(name=name, payload=payload,
+              run_at=timezone.now() + timedelta(seconds=delay))
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def backoff(attempts):
+    """Задержка перед попыткой номер attempts + 1, в секундах."""
+    return min(settings.JOBS_RETRY_BASE * 2 ** (attempts - 1),
+               settings.JOBS_RETRY_MAX)
+
+
+def ready_jobs(now):
+    lease = now - timedelta(seconds=settings.JOBS_LEASE)
+    return Job.objects.filter(
+        Q(status=JobStatuses.QUEUED, run_at__lte=now) |
+        Q(status=JobStatuses.RUNNING, locked_at__lt=lease)
+    ).order_by('run_at', 'id')
+
+
+def claim(worker):
+    """Забирает одну готовую задачу или возвращает None."""
+    now = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = ready_jobs(now).select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(
+                status=JobStatuses.RUNNING, locked_at=now, locked_by=worker,
+                started=now, attempts=F('attempts') + 1)
+    else:
+        # Без SKIP LOCKED: кандидата забирает тот, чей UPDATE совпал
+        # с его прежним состоянием.
+        for job in ready_jobs(now)[:10]:
+            claimed = Job.objects.filter(
+                pk=job.pk, status=job.status, locked_at=job.locked_at
+            ).update(status=JobStatuses.RUNNING, locked_at=now,
+                     locked_by=worker, started=now,
+                     attempts=F('attempts') + 1)
+            if claimed:
+                break
+        else:
+            return None
+    job.refresh_from_db()
+    return job
+
+
+def run(job):
+    """Выполняет задачу и фиксирует результат."""
+    try:
+        _handlers[job.name](**job.payload)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        logger.warning('Job %s failed (attempt %s)', job, job.attempts)
+        if job.attempts >= job.max_attempts:
+            changes = {'status': JobStatuses.FAILED, 'finished': now}
+        else:
+            changes = {'status': JobStatuses.QUEUED,
+                       'run_at': now + timedelta(
+                           seconds=backoff(job.attempts))}
+        Job.objects.filter(pk=job.pk).update(last_error=error,
+                                             locked_at=None, **changes)
+        return False
+    Job.objects.filter(pk=job.pk).update(
+        status=JobStatuses.DONE, locked_at=None, finished=timezone.now())
+    return True
+
+
+def run_pending(worker, limit=None):
+    """Выполняет готовые задачи, пока они есть; возвращает их число."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
+
+
+def metrics(window=timedelta(hours=1)):
+    """Глубина очереди и задержки выполнения за последнее `window`."""
+    now = timezone.now()
+    depth = dict(Job.objects.order_by().values_list('status').annotate(
+        Count('id')))
+    ready = ready_jobs(now).aggregate(count=Count('id'),
+                                      oldest=Min('run_at'))
+    finished = Job.objects.filter(status=JobStatuses.DONE,
+                                  finished__gte=now - window)
+    latency = finished.aggregate(
+        wait=Avg(F('started') - F('created')),
+        run=Avg(F('finished') - F('started')),
+        max_wait=Max(F('started') - F('created')))
+    return {
+        'depth': {status: depth.get(status, 0)
+                  for status in JobStatuses.values},
+        'ready': ready['count'],
+        'oldest_ready_age': (now - ready['oldest']).total_seconds()
+        if ready['oldest'] else 0.0,
+        'finished': finished.count(),
+        'wait_avg': seconds(latency['wait']),
+        'wait_max': seconds(latency['max_wait']),
+        'run_avg': seconds(latency['run']),
+    }
+
+
+def seconds(value):
+    return value.total_seconds() if value is not None else 0.0
@@ -1,9 +1,69 @@
-from django.contrib import admin
+import os
 
-from .models import Task, Respond, Transaction, Comment
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 
+from .importer import FORMATS, IMPORTERS, read_rows
+from .models import (Task, Respond, Transaction, Comment, LedgerEntry,
+                     BalanceSnapshot)
 
-class TaskAdmin(admin.ModelAdmin):
+
+class ImportForm(forms.Form):
+    file = forms.FileField()
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        extension = os.path.splitext(upload.name)[1].lstrip('.').lower()
+        if extension not in FORMATS:
+            raise forms.ValidationError('Upload a .csv or .jsonl file')
+        upload.format = extension
+        return upload
+
+
+class ImportAdminMixin:
+    """Загрузка CSV/JSONL в админке через tasks.importer."""
+    import_kind = None
+    change_list_template = 'admin/import_change_list.html'
+    import_errors_shown = 50
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:index')
+        form = ImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            errors = []
+
+            def on_error(line, error):
+                if len(errors) < self.import_errors_shown:
+                    errors.append(f'line {line}: {error}')
+
+            created, failed = IMPORTERS[self.import_kind](on_error).run(
+                read_rows(upload.file, upload.format))
+            self.message_user(request, f'Imported {created}, failed {failed}')
+            for error in errors:
+                self.message_user(request, error, messages.WARNING)
+            return redirect(request.path)
+        return TemplateResponse(request, 'admin/import_form.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': f'Import {self.model._meta.verbose_name_plural}',
+        })
+
+
+class TaskAdmin(ImportAdminMixin, admin.ModelAdmin):
+    import_kind = 'tasks'
     list_display = (
         'id',
         'author',
@@ -11,9 +71,12 @@ class TaskAdmin(admin.ModelAdmin):
         'title',
         'text',
         'status',
-        'price'
+        'price',
+        'respond_count',
+        'comment_count',
     )
     list_editable = ('status',)
+    list_select_related = ('author', 'executor')
 
 
 class RespondAdmin(admin.ModelAdmin):
@@ -36,7 +99,42 @@ class TransactionAdmin(admin.ModelAdmin):
     )
 
 
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'created',
+        'operation',
+        'user',
+        'account',
+        'amount',
+        'task',
+    )
+
+    # Одиночная проводка нарушила бы нулевую сумму операции.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class BalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'created',
+        'user',
+        'last_entry_id',
+        'balance',
+        'freeze_balance',
+    )
+
+
 admin.site.register(Task, TaskAdmin)
 admin.site.register(Comment)
 admin.site.register(Respond, RespondAdmin)
 admin.site.register(Transaction, TransactionAdmin)
+admin.site.register(LedgerEntry, LedgerEntryAdmin)
+admin.site.register(BalanceSnapshot, BalanceSnapshotAdmin)
@@ -0,0 +1,97 @@
+"""Асинхронные read-only эндпоинты для запуска под ASGI.
+
+Отдают те же данные, что и синхронные viewset-ы (лента задач, задача,
+дерево комментариев, профиль /me) из event loop, не проходя через
+синхронный стек DRF. В Django 3.2 у ORM нет async-API, поэтому каждая
+загрузка целиком уходит в sync_to_async - один переход в поток на
+запрос, а не на каждый запрос к БД. thread_sensitive=False раздаёт
+загрузки по пулу потоков: иначе все они выстроились бы в очередь к
+одному общему потоку.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+
+from users.authentication import ClaimsJWTAuthentication
+from .filters import TaskFilter
+from .helpers import load_comment_tree
+from .models import Comment, Task
+from .pagination import task_list_paginator
+from .serializers import CommentSerializer, TaskListSerializer, TasksSerializer
+
+
+def async_read_view(load):
+    """Async-вью вокруг синхронной загрузки load(request, **kwargs).
+
+    Требует аутентификацию так же, как IsAuthor для безопасных методов.
+    """
+    @sync_to_async(thread_sensitive=False)
+    def run(request, **kwargs):
+        request = Request(request,
+                          authenticators=[ClaimsJWTAuthentication()])
+        try:
+            if not request.user.is_authenticated:
+                raise AuthenticationFailed()
+            return load(request, **kwargs)
+        finally:
+            # Соединения потоков пула живут не дольше CONN_MAX_AGE.
+            close_old_connections()
+
+    @wraps(load)
+    async def view(request, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': 'Method not allowed.'},
+                                status=405)
+        try:
+            data = await run(request, **kwargs)
+        except AuthenticationFailed as error:
+            return JsonResponse({'detail': str(error.detail)}, status=401)
+        except Http404:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        return JsonResponse(data, safe=False)
+    return view
+
+
+def paginated(paginator, data):
+    return {'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': data}
+
+
+@async_read_view
+def task_list(request):
+    queryset = TaskFilter(request.query_params,
+                          queryset=Task.objects.select_related('author')).qs
+    paginator = task_list_paginator(request)
+    page = paginator.paginate_queryset(queryset, request)
+    return paginated(paginator, TaskListSerializer(
+        page, many=True, context={'request': request}).data)
+
+
+@async_read_view
+def task_detail(request, pk):
+    task = get_object_or_404(
+        Task.objects.select_related('author').prefetch_related(
+            Prefetch('comments', queryset=Comment.objects.order_by('id'))),
+        pk=pk)
+    return TasksSerializer(task).data
+
+
+@async_read_view
+def comment_list(request, task_id):
+    task = get_object_or_404(Task, pk=task_id)
+    depth = request.query_params.get('depth', '')
+    depth = int(depth) if depth.isdigit() else None
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(
+        task.comments.filter(parent=None).order_by('id'), request)
+    data = paginated(paginator, CommentSerializer(
+        load_comment_tree(page, depth), many=True).data)
+    return {'count': paginator.page.paginator.count, **data}
@@ -0,0 +1,36 @@
+"""Общие утилиты для management-команд bench_*."""
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def benchmark_database(name=None):
+    """Одноразовая тестовая БД, чтобы бенчмарк не трогал рабочую."""
+    if name is not None:
+        connections['default'].settings_dict['TEST']['NAME'] = name
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def measure(func, repeat):
+    """Время `repeat` вызовов `func` в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
@@ -0,0 +1,83 @@
+"""Условные GET-запросы (ETag / If-None-Match / If-Modified-Since).
+
+Версия ответа берётся дешёвым запросом по updated_at ещё до загрузки
+и сериализации данных; если клиент прислал совпадающий ETag или дату,
+сразу отдаётся 304.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Task
+from .pagination import task_list_paginator
+
+
+def make_etag(request, *parts):
+    """ETag из версии данных, строки запроса и формата ответа."""
+    source = '|'.join(str(part) for part in (
+        request.get_full_path(), request.accepted_media_type, *parts))
+    return quote_etag(hashlib.md5(source.encode()).hexdigest())
+
+
+def conditional_get(version):
+    """Декоратор действия viewset.
+
+    version(view, request, **kwargs) возвращает (etag, last_modified)
+    или None, если объекта нет - тогда действие выполняется как обычно.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            current = version(self, request, **kwargs)
+            if current is None:
+                return method(self, request, *args, **kwargs)
+            etag, last_modified = current
+            timestamp = last_modified and int(last_modified.timestamp())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if timestamp:
+                    response['Last-Modified'] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
+
+
+def task_version(view, request, **kwargs):
+    """Версия задачи: комментарии и отклики тоже сдвигают updated_at."""
+    pk = str(kwargs.get('task_id', kwargs.get('pk')))
+    if not pk.isdigit():
+        return None
+    updated_at = Task.objects.filter(pk=pk).values_list(
+        'updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return make_etag(request, pk, updated_at.isoformat()), updated_at
+
+
+def task_list_version(view, request, **kwargs):
+    """Версия страницы ленты: id и updated_at задач этой страницы.
+
+    Считается тем же пагинатором, что и ответ, но без загрузки полей и
+    связей - один запрос по индексу id с LIMIT, без COUNT и агрегатов по
+    всей выборке. Любая правка задачи, её комментариев и откликов
+    сдвигает updated_at, новые и удалённые задачи меняют набор id.
+    Last-Modified не отдаётся: удаление его не сдвигает. Поиск
+    упорядочен по релевантности и считает COUNT для страниц, поэтому
+    отдаётся без ETag.
+    """
+    if request.query_params.get('search'):
+        return None
+    queryset = view.filter_queryset(view.get_queryset()).select_related(
+        None).prefetch_related(None).only('id', 'updated_at')
+    paginator = task_list_paginator(request)
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    return make_etag(request, paginator.get_next_link(),
+                     paginator.get_previous_link(),
+                     *(f'{task.id}:{task.updated_at.isoformat()}'
+                       for task in page)), None
@@ -0,0 +1,147 @@
+"""Лента событий биржи для SSE и long-poll клиентов.
+
+События (task_created, respond_created, winner_chosen, task_done)
+публикуются после коммита транзакции в брокер из settings.EVENTS_BACKEND.
+Каждое событие получает возрастающий id, по которому клиент
+переподключается (Last-Event-ID) и дочитывает пропущенное.
+
+InMemoryBroker живёт в одном процессе. CacheBroker хранит события в
+кэше Django и повторяет схему Redis-стрима (INCR + ключ на событие):
+с общим кэшем (Redis, memcached) ленту видят все процессы.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+TASK_CREATED = 'task_created'
+RESPOND_CREATED = 'respond_created'
+WINNER_CHOSEN = 'winner_chosen'
+TASK_DONE = 'task_done'
+EVENT_TYPES = (TASK_CREATED, RESPOND_CREATED, WINNER_CHOSEN, TASK_DONE)
+
+
+class Broker:
+    """Базовый брокер: ожидание реализовано опросом read()."""
+    poll_interval = 0.2
+
+    def publish(self, event_type, data):
+        raise NotImplementedError
+
+    def read(self, after):
+        """События с id больше `after`, по возрастанию id."""
+        raise NotImplementedError
+
+    def last_id(self):
+        raise NotImplementedError
+
+    def wait(self, after, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self.read(after)
+            if events or time.monotonic() >= deadline:
+                return events
+            time.sleep(self.poll_interval)
+
+    async def wait_async(self, after, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self.read(after)
+            if events or time.monotonic() >= deadline:
+                return events
+            await asyncio.sleep(self.poll_interval)
+
+
+class InMemoryBroker(Broker):
+    """Кольцевой буфер последних событий текущего процесса."""
+    poll_interval = 0.05
+
+    def __init__(self, size=1000):
+        self.events = deque(maxlen=size)
+        self.sequence = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event_type, data):
+        with self.condition:
+            self.sequence += 1
+            event = {'id': self.sequence, 'type': event_type, 'data': data}
+            self.events.append(event)
+            self.condition.notify_all()
+        return event
+
+    def read(self, after):
+        with self.condition:
+            return [event for event in self.events if event['id'] > after]
+
+    def last_id(self):
+        return self.sequence
+
+    def wait(self, after, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > after, timeout)
+        return self.read(after)
+
+
+class CacheBroker(Broker):
+    """События в кэше Django: счётчик и отдельный ключ на событие."""
+    SEQUENCE_KEY = 'events:sequence'
+    EVENT_KEY = 'events:{}'
+
+    def __init__(self, alias='default', size=1000, timeout=3600):
+        self.cache = caches[alias]
+        self.size = size
+        self.timeout = timeout
+
+    def publish(self, event_type, data):
+        self.cache.add(self.SEQUENCE_KEY, 0, None)
+        event_id = self.cache.incr(self.SEQUENCE_KEY)
+        event = {'id': event_id, 'type': event_type, 'data': data}
+        self.cache.set(self.EVENT_KEY.format(event_id), event, self.timeout)
+        return event
+
+    def read(self, after):
+        last = self.last_id()
+        first = max(after + 1, last - self.size + 1)
+        keys = [self.EVENT_KEY.format(event_id)
+                for event_id in range(first, last + 1)]
+        found = self.cache.get_many(keys)
+        return [found[key] for key in keys if key in found]
+
+    def last_id(self):
+        return self.cache.get(self.SEQUENCE_KEY, 0)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            backend = settings.EVENTS_BACKEND
+            _broker = import_string(backend['BACKEND'])(
+                **backend.get('OPTIONS', {}))
+    return _broker
+
+
+def publish(event_type, **data):
+    """Публикует событие после коммита текущей транзакции."""
+    transaction.on_commit(lambda: get_broker().publish(event_type, data))
+
+
+def parse_filters(types=None, task=None):
+    """Фильтры ленты из параметров запроса ?types=a,b&task=<id>."""
+    types = set(types.split(',')) & set(EVENT_TYPES) if types else None
+    task = int(task) if task and task.isdigit() else None
+    return types, task
+
+
+def matches(event, types=None, task=None):
+    return ((not types or event['type'] in types) and
+            (task is None or event['data'].get('task') == task))
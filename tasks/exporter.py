@@ -0,0 +1,106 @@
+"""Потоковая выгрузка транзакций и задач в CSV/JSONL.
+
+Строки читаются из БД через values_list().iterator(chunk_size): в
+памяти одновременно только одна пачка кортежей, без моделей и без
+кэша результатов QuerySet. Готовый текст отдаётся кусками по
+CHUNK_BYTES, при необходимости сжатыми в gzip на лету, поэтому память
+не зависит от числа строк.
+"""
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .filters import TaskExportFilter, TransactionExportFilter
+from .models import Task, Transaction
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+CHUNK_BYTES = 64 * 1024
+
+
+class Export:
+    def __init__(self, model, filterset_class, columns, private=False):
+        self.model = model
+        self.filterset_class = filterset_class
+        self.columns = columns
+        # Приватные выгрузки ограничиваются QuerySet.visible_to(user).
+        self.private = private
+
+    def queryset(self, params, user=None):
+        """Отфильтрованная выборка; user=None - без ограничения доступа.
+
+        При неверных фильтрах возвращает None и ошибки формы.
+        """
+        queryset = self.model.objects.all()
+        if user is not None and self.private:
+            queryset = queryset.visible_to(user)
+        filterset = self.filterset_class(params, queryset=queryset)
+        if not filterset.is_valid():
+            return None, filterset.errors
+        return filterset.qs.order_by('id'), None
+
+    def rows(self, queryset, chunk_size=CHUNK_SIZE):
+        return queryset.values_list(*self.columns).iterator(
+            chunk_size=chunk_size)
+
+
+EXPORTS = {
+    'transactions': Export(Transaction, TransactionExportFilter, (
+        'id', 'created', 'status', 'price', 'task_id',
+        'author_id', 'author__username',
+        'executor_id', 'executor__username'), private=True),
+    'tasks': Export(Task, TaskExportFilter, (
+        'id', 'title', 'status', 'price',
+        'author_id', 'author__username',
+        'executor_id', 'executor__username',
+        'respond_count', 'comment_count', 'updated_at')),
+}
+
+
+def encode(rows, columns, fmt):
+    """Куски текста не меньше CHUNK_BYTES из строк-кортежей."""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        write = writer.writerow
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+        def write(row):
+            buffer.write(encoder.encode(dict(zip(columns, row))))
+            buffer.write('\n')
+    for row in rows:
+        write(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks, level=6):
+    """Сжимает поток кусков в один gzip-поток."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, fmt, params, user=None, gzip=False, chunk_size=CHUNK_SIZE):
+    """Итератор байтов выгрузки либо (None, ошибки) при неверных фильтрах."""
+    spec = EXPORTS[kind]
+    queryset, errors = spec.queryset(params, user)
+    if errors:
+        return None, errors
+    chunks = encode(spec.rows(queryset, chunk_size), spec.columns, fmt)
+    return (gzip_chunks(chunks) if gzip else chunks), None
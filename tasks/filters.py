@@ -0,0 +1,54 @@
+import django_filters
+from django.db.models import Q
+
+from .models import Task, Transaction
+from .search import search_tasks
+
+
+class TaskFilter(django_filters.FilterSet):
+    price_min = django_filters.NumberFilter(field_name='price',
+                                            lookup_expr='gte')
+    price_max = django_filters.NumberFilter(field_name='price',
+                                            lookup_expr='lte')
+    author = django_filters.CharFilter(field_name='author__username')
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Task
+        fields = ('status', 'executor', 'author', 'price_min', 'price_max')
+
+    def filter_search(self, queryset, name, value):
+        return search_tasks(queryset, value)
+
+
+class ExportFilter(django_filters.FilterSet):
+    """Фильтры выгрузки: период [since, until), участник и статус."""
+    date_field = None
+    since = django_filters.DateTimeFilter(method='filter_since')
+    until = django_filters.DateTimeFilter(method='filter_until')
+    user = django_filters.NumberFilter(method='filter_user')
+
+    def filter_since(self, queryset, name, value):
+        return queryset.filter(**{f'{self.date_field}__gte': value})
+
+    def filter_until(self, queryset, name, value):
+        return queryset.filter(**{f'{self.date_field}__lt': value})
+
+    def filter_user(self, queryset, name, value):
+        return queryset.filter(Q(author_id=value) | Q(executor_id=value))
+
+
+class TransactionExportFilter(ExportFilter):
+    date_field = 'created'
+
+    class Meta:
+        model = Transaction
+        fields = ('status',)
+
+
+class TaskExportFilter(ExportFilter):
+    date_field = 'updated_at'
+
+    class Meta:
+        model = Task
+        fields = ('status',)
@@ -0,0 +1,276 @@
+"""Синтетические данные для нагрузочных тестов: миллионы строк за минуты.
+
+Строки пишутся executemany готовыми кортежами пачками по chunk_size, в
+обход построения моделей: bulk_create тратит на компиляцию SQL больше
+времени, чем SQLite на саму вставку. id раздаются заранее от текущего
+максимума, поэтому пути комментариев, отклики и транзакции строятся без
+перечитывания только что вставленного. Все случайные величины берутся из
+random.Random(seed) - один seed даёт одни и те же данные.
+
+Распределения: авторы задач по закону Ципфа, цены логнормальные,
+статусы с весами STATUS_WEIGHTS, число откликов и комментариев на задачу
+экспоненциальное, комментарии ветками глубиной до max_depth.
+Балансы согласованы с задачами и заведены в журнал одной открывающей
+проводкой на пользователя, так что verify_ledger проходит.
+"""
+import random
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import permutations
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (Comment, LedgerAccount, LedgerEntry, Respond, Task,
+                     TaskStatuses, Transaction)
+from .search import deferred_search_index
+
+User = get_user_model()
+
+DEFAULT_PASSWORD = 'password'
+STATUS_WEIGHTS = {
+    TaskStatuses.ACTIVE: 55,
+    TaskStatuses.IN_PROGRESS: 15,
+    TaskStatuses.DONE: 25,
+    TaskStatuses.ABANDONED: 5,
+}
+FROZEN = (TaskStatuses.ACTIVE, TaskStatuses.IN_PROGRESS)
+WORDS = ('logo', 'landing', 'django', 'api', 'bot', 'parser', 'design',
+         'mobile', 'translate', 'article', 'video', 'excel', 'shop',
+         'crm', 'bugfix', 'review', 'deploy', 'docker', 'react', 'seo')
+TITLE_WORDS = list(permutations(WORDS, 3))
+# Кэш страниц SQLite на время генерации, КБ.
+SQLITE_CACHE_KB = 256 * 1024
+BULK_MODELS = (Task, Respond, Comment, Transaction, LedgerEntry)
+
+
+def insert_rows(model, fields, rows):
+    """INSERT готовых для БД значений полей `fields` одним executemany."""
+    meta = model._meta
+    columns = ', '.join(connection.ops.quote_name(meta.get_field(name).column)
+                        for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(meta.db_table)} '
+            f'({columns}) VALUES ({placeholders})', rows)
+
+
+@contextmanager
+def bulk_load():
+    """Настройки соединения на время генерации.
+
+    Ссылки между строками генератор проставляет сам, поэтому проверка
+    внешних ключей отключается. На SQLite ещё и fsync: оборванную
+    генерацию всё равно проще запустить заново.
+    """
+    pragmas = {}
+    indexes = []
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            # Уровень надёжности не меняется внутри транзакции.
+            changes = [('cache_size', -SQLITE_CACHE_KB)]
+            if not connection.in_atomic_block:
+                changes.append(('synchronous', 'OFF'))
+            for name, value in changes:
+                pragmas[name] = cursor.execute(
+                    f'PRAGMA {name}').fetchone()[0]
+                cursor.execute(f'PRAGMA {name} = {value}')
+            # Индексы дешевле построить один раз по готовой таблице, чем
+            # обновлять на каждой вставке. Уникальные индексы из
+            # ограничений таблицы (sql IS NULL) остаются на месте.
+            tables = [model._meta.db_table for model in BULK_MODELS]
+            indexes = cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                "AND sql IS NOT NULL AND tbl_name IN (%s)"
+                % ', '.join(['%s'] * len(tables)), tables).fetchall()
+            for name, _ in indexes:
+                cursor.execute(
+                    f'DROP INDEX {connection.ops.quote_name(name)}')
+    try:
+        with connection.constraint_checks_disabled():
+            yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+class Generator:
+    def __init__(self, seed=0, chunk_size=10_000, max_depth=5,
+                 password=DEFAULT_PASSWORD):
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.max_depth = max_depth
+        self.password = make_password(password)
+        self.now = connection.ops.adapt_datetimefield_value(timezone.now())
+        self.counts = defaultdict(int)
+
+    def run(self, users, tasks, responds=2.0, comments=1.0,
+            author_share=0.3):
+        """Генерирует всё; responds и comments - средние на задачу."""
+        with bulk_load():
+            return self.generate(users, tasks, responds, comments,
+                                 author_share)
+
+    def generate(self, users, tasks, responds, comments, author_share):
+        authors, executors = self.users(users, author_share)
+        if tasks and not (authors and executors):
+            raise ValueError('Tasks need at least one author and '
+                             'one executor')
+        self.author_weights = []
+        total = 0.0
+        for rank in range(len(authors)):
+            total += 1 / (rank + 1)
+            self.author_weights.append(total)
+        self.next_task = next_id(Task)
+        self.next_respond = next_id(Respond)
+        self.next_comment = next_id(Comment)
+        balances = defaultdict(int)
+        freezes = defaultdict(int)
+        with deferred_search_index(connection):
+            for start in range(0, tasks, self.chunk_size):
+                with transaction.atomic():
+                    self.tasks(min(self.chunk_size, tasks - start), authors,
+                               executors, responds, comments, balances,
+                               freezes)
+        with transaction.atomic():
+            self.balances(authors, executors, balances, freezes)
+        # Явные id не двигают последовательности PostgreSQL.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Task, Respond, Comment]):
+                cursor.execute(sql)
+        return dict(self.counts)
+
+    def users(self, count, author_share):
+        first = next_id(User)
+        ids = range(first, first + count)
+        authors = [user_id for user_id in ids
+                   if self.random.random() < author_share]
+        author_set = set(authors)
+        rows = [(user_id, self.password, f'user{user_id}',
+                 f'user{user_id}@example.com',
+                 'author' if user_id in author_set else 'executor',
+                 0, 0, False, True, False, self.now, '', '')
+                for user_id in ids]
+        fields = ('id', 'password', 'username', 'email', 'role', 'balance',
+                  'freeze_balance', 'is_staff', 'is_active', 'is_superuser',
+                  'date_joined', 'first_name', 'last_name')
+        for start in range(0, count, self.chunk_size):
+            with transaction.atomic():
+                insert_rows(User, fields,
+                            rows[start:start + self.chunk_size])
+        self.counts['users'] += count
+        return authors, [user_id for user_id in ids
+                         if user_id not in author_set]
+
+    def tasks(self, count, authors, executors, responds, comments,
+              balances, freezes):
+        rng = self.random
+        task_rows, respond_rows, comment_rows, transaction_rows = (
+            [], [], [], [])
+        statuses = rng.choices(list(STATUS_WEIGHTS),
+                               list(STATUS_WEIGHTS.values()), k=count)
+        task_authors = rng.choices(authors, cum_weights=self.author_weights,
+                                   k=count)
+        for status, author_id in zip(statuses, task_authors):
+            task_id = self.next_task
+            self.next_task += 1
+            price = max(10, int(round(rng.lognormvariate(6.2, 0.8), -1)))
+            executor_id = (rng.choice(executors) if status in (
+                TaskStatuses.IN_PROGRESS, TaskStatuses.DONE) else None)
+            # Повторы схлопываются: откликов выходит чуть меньше среднего,
+            # зато без дорогого random.sample на каждую задачу.
+            responders = {
+                executors[int(rng.random() * len(executors))]
+                for _ in range(int(rng.expovariate(1 / responds)))
+            } if responds else set()
+            if executor_id is not None:
+                responders.add(executor_id)
+            for responder in responders:
+                respond_rows.append((self.next_respond, task_id, responder))
+                self.next_respond += 1
+            comment_count = self.comments(
+                task_id, int(rng.expovariate(1 / comments)) if comments
+                else 0, comment_rows)
+            words = TITLE_WORDS[int(rng.random() * len(TITLE_WORDS))]
+            task_rows.append((
+                task_id, author_id, executor_id, ' '.join(words).capitalize(),
+                f'Need {words[0]} for {words[1]} with {words[2]}.', status,
+                price, len(responders), comment_count, self.now))
+            if status in FROZEN:
+                freezes[author_id] += price
+            elif status == TaskStatuses.DONE:
+                balances[executor_id] += price
+                transaction_rows.append((self.now, task_id, author_id,
+                                         executor_id, price,
+                                         Transaction.SUCCESS))
+        insert_rows(Task, ('id', 'author', 'executor', 'title', 'text',
+                           'status', 'price', 'respond_count',
+                           'comment_count', 'updated_at'), task_rows)
+        insert_rows(Respond, ('id', 'task', 'author'), respond_rows)
+        insert_rows(Comment, ('id', 'task', 'parent', 'text', 'path',
+                              'depth', 'updated_at'), comment_rows)
+        insert_rows(Transaction, ('created', 'task', 'author', 'executor',
+                                  'price', 'status'), transaction_rows)
+        for name, rows in (('tasks', task_rows), ('responds', respond_rows),
+                           ('comments', comment_rows),
+                           ('transactions', transaction_rows)):
+            self.counts[name] += len(rows)
+
+    def comments(self, task_id, count, rows):
+        """Ветки комментариев: каждый следующий чаще отвечает предыдущему."""
+        parent = None
+        for number in range(count):
+            comment_id = self.next_comment
+            self.next_comment += 1
+            if (parent is not None and parent[2] < self.max_depth and
+                    self.random.random() < 0.7):
+                parent_id, path, depth = parent[0], parent[1], parent[2] + 1
+            else:
+                parent_id, path, depth = None, '', 0
+            path = Comment.build_path(comment_id, path)
+            rows.append((comment_id, task_id, parent_id,
+                         f'Comment {number}', path, depth, self.now))
+            parent = (comment_id, path, depth)
+        return count
+
+    def balances(self, authors, executors, balances, freezes):
+        for author_id in authors:
+            balances[author_id] += self.random.randrange(0, 100_000, 100)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {connection.ops.quote_name(User._meta.db_table)} '
+                f'SET balance = %s, freeze_balance = %s WHERE id = %s',
+                [(balances[user_id], freezes[user_id], user_id)
+                 for user_id in set(balances) | set(freezes)])
+        operation = LedgerEntry._meta.get_field('operation')
+        rows = []
+        for user_id in set(balances) | set(freezes):
+            balance, freeze = balances[user_id], freezes[user_id]
+            if not balance and not freeze:
+                continue
+            key = operation.get_db_prep_value(
+                uuid.UUID(int=self.random.getrandbits(128), version=4),
+                connection)
+            rows.append((key, None, LedgerAccount.EXTERNAL,
+                         -(balance + freeze), self.now))
+            rows += [(key, user_id, account, amount, self.now)
+                     for account, amount in ((LedgerAccount.BALANCE, balance),
+                                             (LedgerAccount.FREEZE, freeze))
+                     if amount]
+        insert_rows(LedgerEntry, ('operation', 'user', 'account', 'amount',
+                                  'created'), rows)
+        self.counts['ledger_entries'] += len(rows)
@@ -1,22 +1,123 @@
-from tasks.models import Transaction
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from tasks.models import Comment, Transaction, subtree_range
+from users.cache import invalidate_me
+
+_local = threading.local()
+
+
+@contextmanager
+def transaction_batch():
+    """Атомарный блок, в котором записи Transaction копятся в памяти.
+
+    Все записи блока пишутся одним bulk_create перед выходом из него,
+    в той же транзакции, что и движение денег. Вложенные блоки
+    пользуются буфером внешнего.
+    """
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        mark = len(buffer)
+        try:
+            with transaction.atomic():
+                yield buffer
+        except BaseException:
+            del buffer[mark:]
+            raise
+        return
+    _local.buffer = buffer = []
+    try:
+        with transaction.atomic():
+            yield buffer
+            _local.buffer = None
+            log_transactions(*buffer)
+    finally:
+        _local.buffer = None
+
+
+def log_transactions(*transactions):
+    """Пишет записи Transaction: сразу или в буфер transaction_batch."""
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        buffer.extend(transactions)
+    elif transactions:
+        Transaction.objects.bulk_create(transactions)
+        invalidate_me(*(user_id for obj in transactions
+                        for user_id in (obj.author_id, obj.executor_id)))
+
+
+def count_per_task(model):
+    """Подзапрос: число строк `model`, ссылающихся на задачу."""
+    counts = (model.objects.filter(task=OuterRef('pk')).order_by()
+              .values('task').annotate(count=Count('id')).values('count'))
+    return Coalesce(Subquery(counts), 0)
 
 
 class TransactionCreation:
     def __init__(self, task):
         self.task = task
 
-    def create_transaction_success(self, executor=None):
-        Transaction.objects.create(
+    def build(self, status, executor=None):
+        return Transaction(
             task=self.task,
-            author=self.task.author,
+            author_id=self.task.author_id,
             price=self.task.price,
-            executor=executor,
-            status='Success')
+            executor_id=getattr(executor, 'pk', executor),
+            status=status)
+
+    def create_transaction_success(self, executor=None):
+        log_transactions(self.build(Transaction.SUCCESS, executor))
 
     def create_transaction_fail(self, executor=None):
-        Transaction.objects.create(
-            task=self.task,
-            author=self.task.author,
-            price=self.task.price,
-            executor=executor,
-            status='Fail')
+        log_transactions(self.build(Transaction.FAIL, executor))
+
+
+def cache_related(instance, name, objects):
+    """Кладёт готовый список объектов в prefetch-кэш связи `name`."""
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
+
+
+def attach_comment_children(comments):
+    """Строит дерево из уже загруженных комментариев без запросов к БД."""
+    children = defaultdict(list)
+    for comment in comments:
+        if comment.parent_id is not None:
+            children[comment.parent_id].append(comment)
+    for comment in comments:
+        cache_related(comment, 'children', children.get(comment.id, ()))
+    return comments
+
+
+def prefetch_task_comments(task):
+    """Дерево всех комментариев задачи: не больше одного запроса."""
+    comments = list(task.comments.all())
+    cache_related(task, 'comments', comments)
+    return attach_comment_children(comments)
+
+
+def load_comment_tree(roots, max_depth=None):
+    """Загружает ветки комментариев одним запросом по диапазонам path."""
+    roots = list(roots)
+    if not roots:
+        return roots
+    condition = Q()
+    for root in roots:
+        start, end = subtree_range(root.path)
+        condition |= Q(path__gte=start, path__lt=end)
+    queryset = Comment.objects.filter(condition).order_by('path')
+    if max_depth is not None:
+        queryset = queryset.filter(depth__lte=max_depth)
+    given = {root.id: root for root in roots}
+    attach_comment_children([given.get(comment.id, comment)
+                             for comment in queryset])
+    return roots
@@ -0,0 +1,222 @@
+"""Потоковый импорт пользователей и задач из CSV/JSONL.
+
+Строки читаются по одной и обрабатываются пачками по batch_size:
+каждая строка проверяется сериализатором (без запросов к БД), а
+уникальность, авторы и балансы проверяются одним запросом на пачку.
+Пачка пишется bulk_create в отдельной транзакции, заморозка цен задач -
+set-based UPDATE балансов и проводки журнала, как при массовом
+завершении задач. Ошибки копятся не в памяти, а сразу уходят в
+on_error(line, errors).
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from rest_framework import serializers
+
+from users.serializers import UserSerializer
+from . import ledger
+from .exceptions import BalanceTransferError
+from .helpers import TransactionCreation, log_transactions, transaction_batch
+from .models import LedgerAccount, Task, Transaction
+from .serializers import TasksSerializer
+
+User = get_user_model()
+
+FORMATS = ('csv', 'jsonl')
+
+
+class UserImportSerializer(UserSerializer):
+    class Meta(UserSerializer.Meta):
+        fields = ('first_name', 'last_name', 'username', 'email', 'role',
+                  'balance')
+        # Уникальность проверяется одним запросом на пачку.
+        extra_kwargs = {'username': {'validators': []},
+                        'email': {'validators': []}}
+
+
+class TaskImportSerializer(TasksSerializer):
+    author = serializers.CharField(max_length=25)
+
+    class Meta(TasksSerializer.Meta):
+        fields = ('author', 'title', 'text', 'price')
+
+
+def read_rows(stream, fmt):
+    """(номер строки, dict) из бинарного потока, без чтения целиком."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            row = {'__error__': f'Invalid JSON: {error}'}
+        yield number, row
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_with_ids(model, objects):
+    """bulk_create, после которого у объектов заполнены pk.
+
+    SQLite не возвращает id из bulk_create, поэтому id раздаются
+    заранее от текущего максимума; вызывать внутри транзакции.
+    """
+    if not objects:
+        return
+    if not connection.features.can_return_rows_from_bulk_insert:
+        last = model.objects.aggregate(last=Max('id'))['last'] or 0
+        for number, obj in enumerate(objects, last + 1):
+            obj.pk = number
+    model.objects.bulk_create(objects)
+
+
+class Importer:
+    serializer_class = None
+
+    def __init__(self, on_error, batch_size=1000):
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self.created = 0
+        self.failed = 0
+        self.rejected = set()
+        self.serializer = self.serializer_class()
+
+    def error(self, line, errors):
+        self.failed += 1
+        self.rejected.add(line)
+        self.on_error(line, errors)
+
+    def validate(self, batch):
+        # Поля сериализатора строятся один раз, а не на каждую строку.
+        serializer = self.serializer
+        valid = []
+        for line, row in batch:
+            if '__error__' in row:
+                self.error(line, row['__error__'])
+                continue
+            try:
+                valid.append((line, serializer.run_validation(row)))
+            except serializers.ValidationError as error:
+                self.error(line, error.detail)
+        return valid
+
+    def run(self, rows):
+        for batch in batches(rows, self.batch_size):
+            # Строки пачки, о которых уже сообщено.
+            self.rejected = set()
+            valid = self.validate(batch)
+            if not valid:
+                continue
+            try:
+                self.created += self.save(valid)
+            except (BalanceTransferError, IntegrityError) as error:
+                for line, _ in valid:
+                    if line not in self.rejected:
+                        self.error(line, f'Batch rolled back: {error}')
+        return self.created, self.failed
+
+    def save(self, valid):
+        raise NotImplementedError
+
+
+class UserImporter(Importer):
+    serializer_class = UserImportSerializer
+
+    def save(self, valid):
+        usernames = {data['username'] for _, data in valid}
+        emails = {User.objects.normalize_email(data['email'])
+                  for _, data in valid}
+        taken = set(User.objects.filter(
+            username__in=usernames).values_list('username', flat=True))
+        taken |= set(User.objects.filter(
+            email__in=emails).values_list('email', flat=True))
+        # Один неиспользуемый пароль на пачку: генерация случайной строки
+        # на каждого пользователя дороже всей остальной подготовки.
+        password = make_password(None)
+        users = []
+        for line, data in valid:
+            email = User.objects.normalize_email(data['email'])
+            if data['username'] in taken or email in taken:
+                self.error(line, 'User with this username or email '
+                                 'already exists')
+                continue
+            taken |= {data['username'], email}
+            users.append(User(**{**data, 'email': email}, password=password))
+        with transaction.atomic():
+            insert_with_ids(User, users)
+            entries = []
+            for user in users:
+                if user.balance:
+                    entries.extend(ledger.build_entries(
+                        (None, LedgerAccount.EXTERNAL, -user.balance),
+                        (user.pk, LedgerAccount.BALANCE, user.balance)))
+            ledger.write_entries(entries)
+        return len(users)
+
+
+class TaskImporter(Importer):
+    serializer_class = TaskImportSerializer
+
+    def save(self, valid):
+        authors = {username: (pk, balance) for username, pk, balance in
+                   User.objects.filter(
+                       username__in={data['author'] for _, data in valid},
+                       role='author',
+                   ).values_list('username', 'id', 'balance')}
+        spent = defaultdict(Decimal)
+        tasks = []
+        for line, data in valid:
+            if data['author'] not in authors:
+                self.error(line, {'author': 'Unknown author'})
+                continue
+            author_id, balance = authors[data['author']]
+            price = data.get('price', Task._meta.get_field('price').default)
+            if spent[author_id] + price > balance:
+                self.error(line, 'Not enough money on your balance')
+                continue
+            spent[author_id] += price
+            tasks.append(Task(author_id=author_id, title=data['title'],
+                              text=data.get('text', ''), price=price))
+        with transaction_batch():
+            insert_with_ids(Task, tasks)
+            ledger.apply_deltas('balance', {
+                author_id: -amount for author_id, amount in spent.items()},
+                guard=True)
+            ledger.apply_deltas('freeze_balance', spent)
+            ledger.write_entries([entry for task in tasks
+                                  for entry in ledger.build_entries(
+                                      (task.author_id, LedgerAccount.BALANCE,
+                                       -task.price),
+                                      (task.author_id, LedgerAccount.FREEZE,
+                                       task.price),
+                                      task=task.pk)])
+            log_transactions(*(TransactionCreation(task).build(
+                Transaction.SUCCESS) for task in tasks))
+        return len(tasks)
+
+
+IMPORTERS = {
+    'users': UserImporter,
+    'tasks': TaskImporter,
+}
@@ -0,0 +1,222 @@
+"""Движение денег между balance и freeze_balance пользователей.
+
+Каждая операция - условный UPDATE с F()-выражением: проверка остатка и
+списание выполняются в БД одним запросом, поэтому параллельные запросы
+не теряют и не задваивают деньги. Если условие не выполнено, операция
+поднимает BalanceTransferError и откатывается целиком.
+
+Каждая успешная операция дописывает в LedgerEntry парные проводки
+(двойная запись), по которым баланс можно восстановить на любой момент:
+последний BalanceSnapshot плюс проводки после него.
+"""
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import (Case, DecimalField, F, OuterRef, Subquery,
+                              Sum, Value, When)
+from django.db.models.functions import Coalesce
+
+from users.cache import invalidate_me
+from .exceptions import BalanceTransferError
+from .models import BalanceSnapshot, LedgerAccount, LedgerEntry, Task
+
+User = get_user_model()
+
+ACCOUNT_FIELDS = {
+    LedgerAccount.BALANCE: 'balance',
+    LedgerAccount.FREEZE: 'freeze_balance',
+}
+MONEY = DecimalField(max_digits=12, decimal_places=0)
+ZERO = Value(Decimal(0), output_field=MONEY)
+
+
+def build_entries(*postings, task=None):
+    """Проводки одной операции: postings - (user_id, account, amount)."""
+    if sum(amount for _, _, amount in postings) != 0:
+        raise ValueError(f'Postings do not balance: {postings}')
+    operation = uuid.uuid4()
+    task_id = task.pk if isinstance(task, Task) else task
+    return [LedgerEntry(operation=operation, user_id=user_id,
+                        account=account, amount=amount, task_id=task_id)
+            for user_id, account, amount in postings]
+
+
+def write_entries(entries):
+    """Пишет проводки одним INSERT и сбрасывает кэш профилей владельцев."""
+    LedgerEntry.objects.bulk_create(entries)
+    invalidate_me(*(entry.user_id for entry in entries))
+
+
+def record(*postings, task=None):
+    """Пишет проводки одной операции одним INSERT."""
+    write_entries(build_entries(*postings, task=task))
+
+
+def _move(user_id, amount, source, target, task=None):
+    with transaction.atomic():
+        source_field = ACCOUNT_FIELDS[source]
+        target_field = ACCOUNT_FIELDS[target]
+        updated = User.objects.filter(
+            pk=user_id, **{f'{source_field}__gte': amount}
+        ).update(**{source_field: F(source_field) - amount,
+                    target_field: F(target_field) + amount})
+        if not updated:
+            raise BalanceTransferError(
+                f'Not enough {source_field} of user {user_id} '
+                f'to move {amount}')
+        record((user_id, source, -amount), (user_id, target, amount),
+               task=task)
+
+
+def freeze(user_id, amount, task=None):
+    """Замораживает `amount` на балансе автора под задачу."""
+    _move(user_id, amount, LedgerAccount.BALANCE, LedgerAccount.FREEZE,
+          task)
+
+
+def release(user_id, amount, task=None):
+    """Возвращает замороженные `amount` на баланс автора."""
+    _move(user_id, amount, LedgerAccount.FREEZE, LedgerAccount.BALANCE,
+          task)
+
+
+def payout(author_id, executor_id, amount, task=None):
+    """Переводит `amount` из замороженных средств автора исполнителю."""
+    with transaction.atomic():
+        updated = User.objects.filter(
+            pk=author_id, freeze_balance__gte=amount
+        ).update(freeze_balance=F('freeze_balance') - amount)
+        if not updated:
+            raise BalanceTransferError(
+                f'Not enough freeze_balance of user {author_id} '
+                f'to pay {amount}')
+        User.objects.filter(pk=executor_id).update(
+            balance=F('balance') + amount)
+        record((author_id, LedgerAccount.FREEZE, -amount),
+               (executor_id, LedgerAccount.BALANCE, amount),
+               task=task)
+
+
+def apply_deltas(field, deltas, guard=False):
+    """Меняет `field` у многих пользователей одним UPDATE.
+
+    deltas - {user_id: изменение}. С guard=True списание проходит только
+    если у каждого пользователя хватает средств, иначе поднимается
+    BalanceTransferError.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Одна ветка CASE на каждую сумму, а не на каждого пользователя:
+    # при массовых операциях суммы часто совпадают.
+    users = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users[delta].append(user_id)
+    amount = Case(*(When(pk__in=ids, then=Value(delta))
+                    for delta, ids in users.items()),
+                  output_field=MONEY)
+    queryset = User.objects.filter(pk__in=deltas)
+    if guard:
+        queryset = queryset.filter(**{f'{field}__gte': -amount})
+    updated = queryset.update(**{field: F(field) + amount})
+    if guard and updated != len(deltas):
+        raise BalanceTransferError(f'Not enough {field} for a bulk update')
+
+
+def bulk_payout(payments):
+    """Выплаты по многим задачам несколькими set-based запросами.
+
+    payments - (author_id, executor_id, amount, task_id).
+    """
+    debits = defaultdict(Decimal)
+    credits = defaultdict(Decimal)
+    entries = []
+    for author_id, executor_id, amount, task_id in payments:
+        debits[author_id] -= amount
+        credits[executor_id] += amount
+        entries.extend(build_entries(
+            (author_id, LedgerAccount.FREEZE, -amount),
+            (executor_id, LedgerAccount.BALANCE, amount),
+            task=task_id))
+    with transaction.atomic():
+        apply_deltas('freeze_balance', debits, guard=True)
+        apply_deltas('balance', credits)
+        write_entries(entries)
+
+
+def refreeze(user_id, old_amount, new_amount, task=None):
+    """Подгоняет замороженную сумму под новую цену задачи."""
+    if new_amount > old_amount:
+        freeze(user_id, new_amount - old_amount, task)
+    elif new_amount < old_amount:
+        release(user_id, old_amount - new_amount, task)
+
+
+def deposit(user_id, amount):
+    """Зачисляет на баланс деньги извне."""
+    with transaction.atomic():
+        User.objects.filter(pk=user_id).update(balance=F('balance') + amount)
+        record((None, LedgerAccount.EXTERNAL, -amount),
+               (user_id, LedgerAccount.BALANCE, amount))
+
+
+def adjust(user_id, balance_delta=0, freeze_delta=0):
+    """Фиксирует в журнале ручную правку балансов (например, из админки)."""
+    postings = [(user_id, account, delta) for account, delta in (
+        (LedgerAccount.BALANCE, balance_delta),
+        (LedgerAccount.FREEZE, freeze_delta)) if delta]
+    if postings:
+        external = -sum(delta for _, _, delta in postings)
+        record((None, LedgerAccount.EXTERNAL, external), *postings)
+
+
+def with_ledger_balances(queryset, at=None, until_entry=None):
+    """Аннотирует пользователей балансами по журналу.
+
+    ledger_balance и ledger_freeze = последний снимок + сумма проводок
+    после него; всё считается коррелированными подзапросами по индексам
+    в том же SELECT. `at` ограничивает расчёт моментом времени,
+    `until_entry` - последней учитываемой проводкой.
+    """
+    snapshots = BalanceSnapshot.objects.filter(user=OuterRef('pk'))
+    if at is not None:
+        snapshots = snapshots.filter(created__lte=at)
+    if until_entry is not None:
+        snapshots = snapshots.filter(last_entry_id__lte=until_entry)
+    snapshots = snapshots.order_by('-last_entry_id')
+    queryset = queryset.annotate(
+        snapshot_entry=Coalesce(
+            Subquery(snapshots.values('last_entry_id')[:1]), 0),
+        snapshot_balance=Coalesce(
+            Subquery(snapshots.values('balance')[:1]), ZERO,
+            output_field=MONEY),
+        snapshot_freeze=Coalesce(
+            Subquery(snapshots.values('freeze_balance')[:1]), ZERO,
+            output_field=MONEY),
+    )
+    for name, account, snapshot in (
+            ('ledger_balance', LedgerAccount.BALANCE, 'snapshot_balance'),
+            ('ledger_freeze', LedgerAccount.FREEZE, 'snapshot_freeze')):
+        entries = LedgerEntry.objects.filter(
+            user=OuterRef('pk'), account=account,
+            id__gt=OuterRef('snapshot_entry'))
+        if at is not None:
+            entries = entries.filter(created__lte=at)
+        if until_entry is not None:
+            entries = entries.filter(id__lte=until_entry)
+        delta = (entries.order_by().values('user')
+                 .annotate(total=Sum('amount')).values('total'))
+        queryset = queryset.annotate(**{name: F(snapshot) + Coalesce(
+            Subquery(delta), ZERO, output_field=MONEY)})
+    return queryset
+
+
+def balance_of(user_id, at=None):
+    """(balance, freeze_balance) пользователя по журналу, в том числе
+    на прошлый момент `at`."""
+    return with_ledger_balances(
+        User.objects.filter(pk=user_id), at
+    ).values_list('ledger_balance', 'ledger_freeze').get()
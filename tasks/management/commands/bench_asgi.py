@@ -0,0 +1,137 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+from freelance1.asgi import application as asgi_application
+from tasks.bench import benchmark_database, percentile
+from tasks.models import Comment, Task
+from users.authentication import ClaimsRefreshToken
+
+User = get_user_model()
+
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность и p99 задержки read-эндпоинтов '
+            'под WSGI (пул потоков) и ASGI (синхронные и async-вью) при '
+            'заданном числе одновременных клиентов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 10, 50])
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user, task = self.seed(options['tasks'], options['comments'])
+            token = str(ClaimsRefreshToken.for_user(user).access_token)
+            endpoints = {
+                'list': ('/tasks/v1/', '/tasks/v1/async/'),
+                'detail': (f'/tasks/v1/{task.id}/',
+                           f'/tasks/v1/async/{task.id}/'),
+                'comments': (f'/tasks/v1/{task.id}/comment/',
+                             f'/tasks/v1/async/{task.id}/comment/'),
+                'me': ('/users/v1/users/me/', '/users/v1/async/users/me/'),
+            }
+            self.stdout.write(f'{"endpoint":<9} {"clients":>7} '
+                              f'{"mode":<11} {"req/s":>8} {"p50":>9} '
+                              f'{"p99":>9}')
+            for name, (sync_path, async_path) in endpoints.items():
+                for concurrency in options['concurrency']:
+                    runs = (
+                        ('wsgi', self.run_wsgi, sync_path),
+                        ('asgi sync', self.run_asgi, sync_path),
+                        ('asgi async', self.run_asgi, async_path),
+                    )
+                    for mode, run, path in runs:
+                        elapsed, timings = run(path, token, concurrency,
+                                               options['requests'])
+                        self.stdout.write(
+                            f'{name:<9} {concurrency:>7} {mode:<11} '
+                            f'{len(timings) / elapsed:>8.0f} '
+                            f'{percentile(timings, 50):>7.2f}ms '
+                            f'{percentile(timings, 99):>7.2f}ms')
+
+    def seed(self, tasks, comments):
+        user = User.objects.create_user(username='bench',
+                                        email='bench@example.com',
+                                        role='author')
+        Task.objects.bulk_create(
+            Task(author=user, title=f'task {number}', price=100)
+            for number in range(tasks))
+        task = Task.objects.order_by('-id').first()
+        parent = None
+        for number in range(comments):
+            # Каждый третий комментарий начинает новую ветку.
+            parent = Comment.objects.create(
+                task=task, text=f'comment {number}',
+                parent=None if number % 3 == 0 else parent)
+        return user, task
+
+    def run_wsgi(self, path, token, concurrency, requests):
+        """Пул потоков перед WSGIHandler, как у threaded WSGI-сервера."""
+        handler = WSGIHandler()
+
+        def call():
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path,
+                'QUERY_STRING': '', 'SERVER_NAME': HOST,
+                'SERVER_PORT': '80', 'HTTP_HOST': HOST,
+                'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.errors': io.StringIO(),
+            }
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            response.close()
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(lambda _: call(), range(requests)))
+        return time.perf_counter() - started, timings
+
+    def run_asgi(self, path, token, concurrency, requests):
+        """`concurrency` клиентов в одном event loop вызывают ASGI-приложение."""
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'server': (HOST, 80), 'client': ('127.0.0.1', 0),
+            'headers': [(b'host', HOST.encode()),
+                        (b'authorization', f'Bearer {token}'.encode())],
+        }
+
+        async def call():
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                pass
+
+            started = time.perf_counter()
+            await asgi_application(dict(scope), receive, send)
+            return (time.perf_counter() - started) * 1000
+
+        async def client(count):
+            return [await call() for _ in range(count)]
+
+        async def main():
+            shares = [requests // concurrency +
+                      (number < requests % concurrency)
+                      for number in range(concurrency)]
+            results = await asyncio.gather(*map(client, shares))
+            return [timing for timings in results for timing in timings]
+
+        started = time.perf_counter()
+        timings = asyncio.run(main())
+        return time.perf_counter() - started, timings
@@ -0,0 +1,96 @@
+import os
+import resource
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tasks.bench import benchmark_database
+from tasks.exporter import export
+from tasks.models import Transaction
+
+User = get_user_model()
+
+MB = 1024 * 1024
+
+
+def current_rss():
+    """Текущий RSS процесса в байтах (пиковый, если нет /proc)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = ('Выгружает N транзакций из одноразовой файловой БД и проверяет, '
+            'что RSS процесса во время выгрузки не превышает --max-rss.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--max-rss', type=int, default=150,
+                            help='Предел RSS в МБ.')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            default='csv')
+        parser.add_argument('--gzip', action='store_true')
+
+    def handle(self, *args, **options):
+        # In-memory SQLite держала бы все строки в RSS этого же процесса.
+        directory = tempfile.mkdtemp()
+        with benchmark_database(os.path.join(directory, 'export.sqlite3')):
+            started = time.perf_counter()
+            self.seed(options['rows'], options['users'],
+                      options['batch_size'])
+            self.stdout.write(f'seeded {options["rows"]} transactions in '
+                              f'{time.perf_counter() - started:.1f}s')
+            self.run(options)
+        os.rmdir(directory)
+
+    def seed(self, rows, users, batch_size):
+        User.objects.bulk_create(
+            User(username=f'bench{number}',
+                 email=f'bench{number}@example.com', role='author')
+            for number in range(users))
+        ids = list(User.objects.values_list('id', flat=True))
+        # bulk_create упирается в построение моделей и SQL; для посева
+        # миллионов строк хватает executemany с готовыми кортежами.
+        table = connection.ops.quote_name(Transaction._meta.db_table)
+        sql = (f'INSERT INTO {table} (created, author_id, executor_id, '
+               f'price, status) VALUES (%s, %s, %s, %s, %s)')
+        created = timezone.now()
+        for start in range(0, rows, batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, [
+                    (created, ids[number % len(ids)],
+                     ids[(number + 1) % len(ids)], number % 1000,
+                     Transaction.SUCCESS)
+                    for number in range(start, min(start + batch_size,
+                                                   rows))])
+
+    def run(self, options):
+        chunks, _ = export('transactions', options['format'], {},
+                           gzip=options['gzip'])
+        baseline = peak = current_rss()
+        size = 0
+        started = time.perf_counter()
+        with open(os.devnull, 'wb') as sink:
+            for number, chunk in enumerate(chunks):
+                sink.write(chunk)
+                size += len(chunk)
+                if number % 64 == 0:
+                    peak = max(peak, current_rss())
+        elapsed = time.perf_counter() - started
+        peak = max(peak, current_rss())
+        self.stdout.write(
+            f'exported {options["rows"]} rows, {size / MB:.1f} MB in '
+            f'{elapsed:.1f}s ({options["rows"] / elapsed:.0f} rows/s); '
+            f'RSS {baseline / MB:.1f} -> {peak / MB:.1f} MB')
+        if peak > options['max_rss'] * MB:
+            raise CommandError(f'RSS {peak / MB:.1f} MB exceeds '
+                               f'--max-rss {options["max_rss"]} MB')
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import Cursor, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from tasks.bench import benchmark_database, measure, percentile
+from tasks.models import Task
+from tasks.pagination import IdCursorPagination
+
+User = get_user_model()
+
+DEPTHS = (0, 0.25, 0.5, 0.75, 0.99)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает задержку глубоких страниц для PageNumberPagination '
+            'и keyset-пагинации по -id на одноразовой БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.seed(options['rows'], options['batch_size'])
+            self.run(options['rows'], options['repeat'])
+
+    def seed(self, rows, batch_size):
+        author = User.objects.create_user(username='bench',
+                                          email='bench@example.com',
+                                          role='author')
+        for start in range(0, rows, batch_size):
+            Task.objects.bulk_create(
+                Task(author=author, title=f'task {number}', price=100)
+                for number in range(start, min(start + batch_size, rows)))
+
+    def run(self, rows, repeat):
+        factory = APIRequestFactory()
+        queryset = Task.objects.all()
+        page_size = IdCursorPagination.page_size
+        max_id = queryset.order_by('-id').values_list('id', flat=True)[0]
+        self.stdout.write(f'{"depth":>6} {"page p50":>10} {"page p99":>10} '
+                          f'{"cursor p50":>11} {"cursor p99":>11}')
+        for depth in DEPTHS:
+            offset = int(rows * depth)
+            page_number = offset // page_size + 1
+            page_request = Request(factory.get('/', {'page': page_number},
+                                                HTTP_HOST='localhost'))
+
+            def by_page_number():
+                list(PageNumberPagination().paginate_queryset(
+                    queryset, page_request))
+
+            cursor_paginator = IdCursorPagination()
+            cursor_paginator.base_url = '/'
+            token = cursor_paginator.encode_cursor(
+                Cursor(offset=0, reverse=False, position=max_id - offset + 1))
+            cursor_request = Request(factory.get(token, HTTP_HOST='localhost'))
+
+            def by_cursor():
+                list(IdCursorPagination().paginate_queryset(
+                    queryset, cursor_request))
+
+            pages = measure(by_page_number, repeat)
+            cursors = measure(by_cursor, repeat)
+            self.stdout.write(
+                f'{depth:>6.0%} {percentile(pages, 50):>8.2f}ms '
+                f'{percentile(pages, 99):>8.2f}ms '
+                f'{percentile(cursors, 50):>9.2f}ms '
+                f'{percentile(cursors, 99):>9.2f}ms')
@@ -0,0 +1,54 @@
+import statistics
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from tasks.bench import benchmark_database, measure
+from tasks.models import Comment, Task
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает задержку эндпоинтов с выключенным и включённым '
+            'ProfilingMiddleware.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = User.objects.create_user(username='bench',
+                                            email='bench@example.com',
+                                            role='author', balance=10 ** 6)
+            Task.objects.bulk_create(
+                Task(author=user, title=f'task {number}', price=100)
+                for number in range(options['tasks']))
+            task = Task.objects.order_by('-id').first()
+            for number in range(20):
+                Comment.objects.create(task=task, text=f'comment {number}')
+            paths = {'TasksViewSet.list': '/tasks/v1/',
+                     'TasksViewSet.retrieve': f'/tasks/v1/{task.id}/',
+                     'CommentsViewSet.list': f'/tasks/v1/{task.id}/comment/',
+                     'UsersViewSet.me': '/users/v1/users/me/'}
+            self.stdout.write(f'{"view":<22} {"off":>9} {"on":>9} '
+                              f'{"overhead":>9}')
+            for name, path in paths.items():
+                timings = {False: [], True: []}
+                # Чередуем раунды, чтобы дрейф машины не шёл в одну сторону.
+                for _ in range(options['rounds']):
+                    for enabled in (False, True):
+                        with override_settings(PROFILING=enabled):
+                            client = APIClient(HTTP_HOST='localhost')
+                            client.force_authenticate(user=user)
+                            client.get(path)
+                            timings[enabled] += measure(
+                                lambda: client.get(path), options['repeat'])
+                off = statistics.median(timings[False])
+                on = statistics.median(timings[True])
+                self.stdout.write(f'{name:<22} {off:>7.3f}ms {on:>7.3f}ms '
+                                  f'{(on / off - 1) * 100:>8.1f}%')
@@ -0,0 +1,63 @@
+import random
+import string
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tasks.bench import benchmark_database, measure, percentile
+from tasks.models import Task
+from tasks.search import search_tasks
+
+User = get_user_model()
+
+VOCABULARY_SIZE = 20_000
+QUERY_RANKS = (10, 100, 1000, 5000)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку полнотекстового поиска задач '
+            '(первая страница + COUNT) на одноразовой БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = [''.join(rng.choices(string.ascii_lowercase, k=7))
+                 for _ in range(VOCABULARY_SIZE)]
+        # Частоты слов по закону Ципфа, как в живых текстах.
+        weights = [1 / rank for rank in range(1, VOCABULARY_SIZE + 1)]
+        with benchmark_database():
+            self.seed(options['rows'], options['batch_size'], rng,
+                      words, weights)
+            queries = [words[rank] for rank in QUERY_RANKS]
+            queries.append(f'{words[10]} {words[100]}')
+            self.run(queries, options['repeat'])
+
+    def seed(self, rows, batch_size, rng, words, weights):
+        author = User.objects.create_user(username='bench',
+                                          email='bench@example.com',
+                                          role='author')
+        for start in range(0, rows, batch_size):
+            Task.objects.bulk_create(
+                Task(author=author,
+                     title=' '.join(rng.choices(words, weights, k=3)),
+                     text=' '.join(rng.choices(words, weights, k=20)),
+                     price=rng.randint(100, 10_000))
+                for _ in range(start, min(start + batch_size, rows)))
+
+    def run(self, queries, repeat):
+        for query in queries:
+            queryset = search_tasks(Task.objects.all(), query)
+
+            def first_page():
+                list(queryset[:10])
+                queryset.count()
+
+            timings = measure(first_page, repeat)
+            self.stdout.write(f'{query!r:>20}: '
+                              f'p50 {percentile(timings, 50):.2f}ms '
+                              f'p99 {percentile(timings, 99):.2f}ms')
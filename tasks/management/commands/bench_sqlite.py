@@ -0,0 +1,168 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.bench import benchmark_database, percentile
+from tasks.generator import Generator
+from tasks.management.commands.bench_workflow import TestClientTransport
+from tasks.models import Task, TaskStatuses
+from users.authentication import ClaimsRefreshToken
+
+User = get_user_model()
+
+# Стандартный sqlite3 Django против настроек из settings.
+CONFIGS = {
+    'default': {'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'tuned': {'CONN_MAX_AGE': settings.DATABASES['default']['CONN_MAX_AGE'],
+              'OPTIONS': settings.DATABASES['default']['OPTIONS']},
+}
+PATHS = ('create', 'settle')
+
+
+class Command(BaseCommand):
+    help = ('Конкурентная запись в SQLite без настроек и с прагмами, '
+            'BEGIN IMMEDIATE и постоянными соединениями freelance1.sqlite: '
+            'создание задач и массовое завершение на файловой БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=10_000)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--batch', type=int, default=5,
+                            help='Задач в одном запросе на завершение.')
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 4, 16])
+        parser.add_argument('--config', choices=sorted(CONFIGS), nargs='+',
+                            default=sorted(CONFIGS))
+
+    def handle(self, *args, **options):
+        settings_dict = connections['default'].settings_dict
+        saved = {key: settings_dict[key] for key in ('CONN_MAX_AGE',
+                                                     'OPTIONS')}
+        directory = tempfile.mkdtemp()
+        results = {}
+        self.stdout.write(f'{"path":<7} {"clients":>7} {"config":<8} '
+                          f'{"req/s":>8} {"p50":>9} {"p99":>9} {"errors":>6}')
+        try:
+            for config in options['config']:
+                # Соединения других потоков строятся из этого же словаря.
+                connections.close_all()
+                settings_dict.update(CONFIGS[config])
+                # Режим журнала хранится в файле, поэтому своя БД на каждый
+                # вариант.
+                path = os.path.join(directory, f'{config}.sqlite3')
+                with benchmark_database(path):
+                    Generator(chunk_size=5000).run(options['users'],
+                                                   options['tasks'])
+                    for concurrency in options['concurrency']:
+                        for name, result in self.run(
+                                concurrency, options['requests'],
+                                options['batch']).items():
+                            results[name, concurrency, config] = result
+                            self.report(name, concurrency, config, result)
+        finally:
+            connections.close_all()
+            settings_dict.update(saved)
+            shutil.rmtree(directory)
+        if set(CONFIGS) <= set(options['config']):
+            for name in PATHS:
+                for concurrency in options['concurrency']:
+                    before = results[name, concurrency, 'default']
+                    after = results[name, concurrency, 'tuned']
+                    self.stdout.write(
+                        f'{name} x{concurrency}: req/s '
+                        f'{after["rps"] / before["rps"]:.2f}x, '
+                        f'errors {before["errors"]} -> {after["errors"]}')
+
+    def clients(self, concurrency, settle):
+        """Токены авторов и id задач в работе, которые каждый завершит."""
+        password = make_password(None)
+        # Пользователей с проводками не удалить: у прогона свои клиенты.
+        prefix = uuid.uuid4().hex[:8]
+        names = [(f'{role}-{prefix}-{number}', role)
+                 for number in range(concurrency)
+                 for role in ('author', 'executor')]
+        User.objects.bulk_create(
+            User(username=name, email=f'{name}@example.com', role=role,
+                 balance=10 ** 9, freeze_balance=10 ** 9, password=password)
+            for name, role in names)
+        users = User.objects.in_bulk([name for name, _ in names],
+                                     field_name='username')
+        clients = []
+        for number in range(concurrency):
+            author = users[f'author-{prefix}-{number}']
+            Task.objects.bulk_create(
+                Task(author=author,
+                     executor=users[f'executor-{prefix}-{number}'],
+                     title='bench', price=1,
+                     status=TaskStatuses.IN_PROGRESS)
+                for _ in range(settle))
+            clients.append((
+                str(ClaimsRefreshToken.for_user(author).access_token),
+                list(Task.objects.filter(
+                    author=author, status=TaskStatuses.IN_PROGRESS
+                ).values_list('id', flat=True))))
+        return clients
+
+    def run(self, concurrency, requests, batch):
+        # Ошибки блокировок считаются в отчёте, трейсбеки каждой не нужны.
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        shares = [requests // concurrency + (number < requests % concurrency)
+                  for number in range(concurrency)]
+        clients = self.clients(concurrency, max(shares) * batch)
+        transport = TestClientTransport()
+        lock = threading.Lock()
+
+        def phase(name):
+            timings = []
+            errors = 0
+
+            def client(number, count):
+                nonlocal errors
+                token, task_ids = clients[number]
+                try:
+                    for index in range(count):
+                        if name == 'create':
+                            body = {'title': 'bench', 'text': 'bench',
+                                    'price': 1}
+                            path = '/tasks/v1/'
+                        else:
+                            body = {'tasks': task_ids[
+                                index * batch:(index + 1) * batch]}
+                            path = '/tasks/v1/settle/'
+                        started = time.perf_counter()
+                        status, _, _ = transport.request('POST', path, token,
+                                                         body)
+                        elapsed = (time.perf_counter() - started) * 1000
+                        with lock:
+                            timings.append(elapsed)
+                            errors += status >= 400
+                finally:
+                    connections.close_all()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(client, range(concurrency), shares))
+            elapsed = time.perf_counter() - started
+            return {'rps': requests / elapsed,
+                    'p50': percentile(timings, 50),
+                    'p99': percentile(timings, 99), 'errors': errors}
+
+        return {name: phase(name) for name in PATHS}
+
+    def report(self, name, concurrency, config, result):
+        self.stdout.write(
+            f'{name:<7} {concurrency:>7} {config:<8} {result["rps"]:>8.1f} '
+            f'{result["p50"]:>7.2f}ms {result["p99"]:>7.2f}ms '
+            f'{result["errors"]:>6}')
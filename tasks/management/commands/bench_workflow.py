@@ -0,0 +1,315 @@
+import http.client
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler)
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+
+from tasks.bench import benchmark_database, percentile
+from tasks.generator import Generator
+from users.authentication import ClaimsRefreshToken
+
+User = get_user_model()
+
+HOST = 'localhost'
+STEPS = ('create', 'respond', 'winner', 'done')
+QUERIES_HEADER = 'X-Bench-Queries'
+
+
+class QueryCounter:
+    """Считает SQL-запросы текущего потока на всех соединениях."""
+
+    def __init__(self):
+        self.count = 0
+        self.stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.close()
+
+
+def counting_app(app):
+    """WSGI-обёртка, которая отдаёт число запросов к БД в заголовке."""
+    def wrapped(environ, start_response):
+        with QueryCounter() as counter:
+            def start(status, headers, exc_info=None):
+                return start_response(
+                    status, [*headers, (QUERIES_HEADER, str(counter.count))],
+                    exc_info)
+            return app(environ, start)
+    return wrapped
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class TestClientTransport:
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, token, body=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client(
+                raise_request_exception=False, HTTP_HOST=HOST)
+        with QueryCounter() as counter:
+            response = client.generic(
+                method, path, json.dumps(body or {}),
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {token}')
+        return response.status_code, response.content, counter.count
+
+
+class ServerTransport:
+    """Настоящий HTTP-сервер Django в потоке этого процесса."""
+
+    def __init__(self):
+        self.server = ThreadedWSGIServer((HOST, 0), QuietHandler)
+        self.server.set_app(counting_app(get_wsgi_application()))
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def request(self, method, path, token, body=None):
+        connection = http.client.HTTPConnection(HOST, self.port)
+        try:
+            connection.request(method, path, json.dumps(body or {}), {
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {token}'})
+            response = connection.getresponse()
+            content = response.read()
+            return (response.status, content,
+                    int(response.getheader(QUERIES_HEADER, 0)))
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+TRANSPORTS = {
+    'client': TestClientTransport,
+    'server': ServerTransport,
+}
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон полного цикла задачи: создание -> отклик -> '
+            'выбор исполнителя -> DONE, через тестовый клиент и локальный '
+            'HTTP-сервер. Результаты можно сохранить в JSON и сравнить с '
+            'прошлым прогоном.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=10_000)
+        parser.add_argument('--comments', type=float, default=1.0,
+                            help='Комментариев на задачу в среднем.')
+        parser.add_argument('--workflows', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 4])
+        parser.add_argument('--transport', choices=sorted(TRANSPORTS),
+                            nargs='+', default=sorted(TRANSPORTS))
+        parser.add_argument('--output', help='Куда сохранить JSON.')
+        parser.add_argument('--compare', help='JSON прошлого прогона.')
+
+    def handle(self, *args, **options):
+        # Файловая БД: соединения потоков сервера и клиентов видят одни
+        # данные и ждут блокировку, а не падают на ней.
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'workflow.sqlite3')
+        with benchmark_database(path):
+            started = time.perf_counter()
+            self.seed(options['users'], options['tasks'],
+                      options['comments'])
+            self.stdout.write(f'seeded in {time.perf_counter() - started:.1f}s')
+            runs = []
+            for name in options['transport']:
+                transport = TRANSPORTS[name]()
+                try:
+                    for concurrency in options['concurrency']:
+                        run = self.run(transport, concurrency,
+                                       options['workflows'])
+                        run.update(transport=name, concurrency=concurrency)
+                        runs.append(run)
+                        self.report(run)
+                finally:
+                    if hasattr(transport, 'close'):
+                        transport.close()
+        # Постоянные соединения потоков сервера оставляют -wal и -shm.
+        shutil.rmtree(directory)
+        result = {
+            'commit': self.commit(),
+            'date': datetime.now(timezone.utc).isoformat(),
+            'params': {key: options[key] for key in (
+                'users', 'tasks', 'comments', 'workflows')},
+            'runs': runs,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2)
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.compare(json.load(previous), result)
+
+    def seed(self, users, tasks, comments):
+        Generator(chunk_size=5000).run(users, tasks, comments=comments)
+
+    def pairs(self, count, prefix):
+        """Пары (токен автора, токен исполнителя) для клиентов."""
+        password = make_password(None)
+        names = [(f'{role}-{prefix}-{number}', role)
+                 for number in range(count) for role in ('author', 'executor')]
+        User.objects.bulk_create(
+            User(username=name, email=f'{name}@example.com', role=role,
+                 balance=10 ** 9, password=password)
+            for name, role in names)
+        users = User.objects.in_bulk([name for name, _ in names],
+                                     field_name='username')
+        return [tuple(str(ClaimsRefreshToken.for_user(
+                    users[f'{role}-{prefix}-{number}']).access_token)
+                      for role in ('author', 'executor'))
+                for number in range(count)]
+
+    def run(self, transport, concurrency, workflows):
+        # Ошибки считаются в отчёте, трейсбеки каждой из них не нужны;
+        # get_wsgi_application() заново настраивает логирование, поэтому
+        # уровень ставится здесь.
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        # Пользователей с проводками не удалить, поэтому у каждого прогона
+        # свои клиенты.
+        pairs = self.pairs(concurrency, uuid.uuid4().hex[:8])
+        samples = {step: [] for step in STEPS}
+        errors = []
+        lock = threading.Lock()
+
+        def call(step, method, path, token, body=None):
+            started = time.perf_counter()
+            status, content, queries = transport.request(method, path,
+                                                         token, body)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                samples[step].append((elapsed, queries))
+                if status >= 400:
+                    errors.append(f'{step} {status}')
+            return json.loads(content) if status < 400 else None
+
+        def client(number, count):
+            author, executor = pairs[number]
+            for _ in range(count):
+                task = call('create', 'POST', '/tasks/v1/', author,
+                            {'title': 'bench', 'text': 'bench',
+                             'price': 100})
+                if task is None:
+                    continue
+                respond = call('respond', 'POST',
+                               f'/tasks/v1/{task["id"]}/respond/', executor,
+                               {'task': task['id']})
+                if respond is None:
+                    continue
+                call('winner', 'PATCH',
+                     f'/tasks/v1/{task["id"]}/respond/{respond["id"]}'
+                     f'/winner/', author)
+                call('done', 'PATCH', f'/tasks/v1/{task["id"]}/', author,
+                     {'status': 'done'})
+
+        shares = [workflows // concurrency + (number < workflows % concurrency)
+                  for number in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(client, range(concurrency), shares))
+        elapsed = time.perf_counter() - started
+        return {
+            'elapsed': elapsed,
+            'workflows_per_second': workflows / elapsed,
+            'requests_per_second': sum(map(len, samples.values())) / elapsed,
+            'errors': dict(Counter(errors)),
+            'steps': {step: summarize(values)
+                      for step, values in samples.items()},
+        }
+
+    def report(self, run):
+        self.stdout.write(
+            f'{run["transport"]} x{run["concurrency"]}: '
+            f'{run["workflows_per_second"]:.1f} workflows/s, '
+            f'{run["requests_per_second"]:.1f} req/s, '
+            f'errors: {run["errors"] or "none"}')
+        for step, stats in run['steps'].items():
+            self.stdout.write(
+                f'  {step:<8} p50 {stats["p50"]:>7.2f}ms '
+                f'p95 {stats["p95"]:>7.2f}ms p99 {stats["p99"]:>7.2f}ms '
+                f'queries {stats["queries"]:.1f}')
+
+    def compare(self, previous, current):
+        self.stdout.write(f'vs {previous["commit"]} ({previous["date"]}):')
+        old = {(run['transport'], run['concurrency']): run
+               for run in previous['runs']}
+        for run in current['runs']:
+            before = old.get((run['transport'], run['concurrency']))
+            if before is None:
+                continue
+            self.stdout.write(
+                f'{run["transport"]} x{run["concurrency"]}: workflows/s '
+                f'{change(before["workflows_per_second"], run["workflows_per_second"])}')
+            for step, stats in run['steps'].items():
+                was = before['steps'].get(step)
+                if was:
+                    self.stdout.write(
+                        f'  {step:<8} p99 {change(was["p99"], stats["p99"])} '
+                        f'queries {was["queries"]:.1f} -> '
+                        f'{stats["queries"]:.1f}')
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+
+def summarize(values):
+    timings = [elapsed for elapsed, _ in values]
+    return {
+        'count': len(values),
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'queries': statistics.mean(queries for _, queries in values)
+        if values else 0.0,
+    }
+
+
+def change(before, after):
+    return (f'{before:.2f} -> {after:.2f} '
+            f'({(after / before - 1) * 100 if before else 0:+.1f}%)')
@@ -0,0 +1,46 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.exporter import CHUNK_SIZE, EXPORTS, FORMATS, export
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает транзакции или задачи в CSV/JSONL, '
+            'при необходимости сжимая в gzip.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('path', help='Файл или - для stdout.')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--since', help='Дата или время, включительно.')
+        parser.add_argument('--until', help='Дата или время, не включая.')
+        parser.add_argument('--user', type=int,
+                            help='id автора или исполнителя.')
+        parser.add_argument('--status')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        params = {name: options[name]
+                  for name in ('since', 'until', 'user', 'status')
+                  if options[name] is not None}
+        chunks, errors = export(options['kind'], options['format'], params,
+                                gzip=options['gzip'],
+                                chunk_size=options['chunk_size'])
+        if errors:
+            raise CommandError(dict(errors))
+        stream = (sys.stdout.buffer if options['path'] == '-'
+                  else open(options['path'], 'wb'))
+        started = time.perf_counter()
+        size = 0
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+                size += len(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f'{size} bytes in {elapsed:.2f}s')
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.generator import DEFAULT_PASSWORD, Generator
+
+
+class Command(BaseCommand):
+    help = ('Генерирует детерминированные синтетические данные: '
+            'пользователей, задачи, отклики, ветки комментариев, '
+            'транзакции и открывающие проводки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--tasks', type=int, default=100_000)
+        parser.add_argument('--responds', type=float, default=2.0,
+                            help='Откликов на задачу в среднем.')
+        parser.add_argument('--comments', type=float, default=1.0,
+                            help='Комментариев на задачу в среднем.')
+        parser.add_argument('--depth', type=int, default=5,
+                            help='Наибольшая глубина ветки комментариев.')
+        parser.add_argument('--authors', type=float, default=0.3,
+                            help='Доля авторов среди пользователей.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+        parser.add_argument('--password', default=DEFAULT_PASSWORD,
+                            help='Пароль всех пользователей.')
+
+    def handle(self, *args, **options):
+        generator = Generator(options['seed'], options['chunk_size'],
+                              options['depth'], options['password'])
+        started = time.perf_counter()
+        try:
+            counts = generator.run(options['users'], options['tasks'],
+                                   options['responds'], options['comments'],
+                                   options['authors'])
+        except ValueError as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(
+            f'{sum(counts.values())} rows in {elapsed:.1f}s '
+            f'({sum(counts.values()) / elapsed:.0f} rows/s)')
@@ -0,0 +1,48 @@
+import csv
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.importer import FORMATS, IMPORTERS, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Потоково импортирует пользователей или задачи из CSV/JSONL; '
+            'ошибки по строкам пишутся в отчёт CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='Файл или - для stdin.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--report', help='Куда писать ошибки '
+                                             '(по умолчанию stderr).')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(
+            options['path'])[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError('Pass --format csv or --format jsonl')
+        report = (open(options['report'], 'w', newline='')
+                  if options['report'] else self.stderr._out)
+        writer = csv.writer(report)
+        writer.writerow(['line', 'errors'])
+        stream = (sys.stdin.buffer if options['path'] == '-'
+                  else open(options['path'], 'rb'))
+        started = time.perf_counter()
+        try:
+            importer = IMPORTERS[options['kind']](
+                lambda line, errors: writer.writerow([line, errors]),
+                options['batch_size'])
+            created, failed = importer.run(read_rows(stream, fmt))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+            if options['report']:
+                report.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{created} created, {failed} failed in {elapsed:.2f}s '
+            f'({(created + failed) / max(elapsed, 1e-9):.0f} rows/s)')
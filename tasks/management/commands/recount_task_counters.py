@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from tasks.helpers import count_per_task
+from tasks.models import Comment, Respond, Task
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает respond_count и comment_count задач, '
+            'разошедшиеся с реальным числом откликов и комментариев.')
+
+    def handle(self, *args, **options):
+        actual = {'respond_count': count_per_task(Respond),
+                  'comment_count': count_per_task(Comment)}
+        drifted = Task.objects.annotate(
+            actual_responds=actual['respond_count'],
+            actual_comments=actual['comment_count'],
+        ).exclude(respond_count=F('actual_responds'),
+                  comment_count=F('actual_comments'))
+        fixed = Task.objects.filter(
+            pk__in=drifted.values('pk')).update(**actual)
+        self.stdout.write(f'{fixed} tasks recounted')
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from tasks.ledger import with_ledger_balances
+from tasks.models import BalanceSnapshot, LedgerEntry
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сохраняет снимки балансов пользователей, у которых появились '
+            'проводки после предыдущего снимка.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        last_entry = LedgerEntry.objects.order_by('-id').values_list(
+            'id', flat=True).first()
+        if last_entry is None:
+            self.stdout.write('Ledger is empty')
+            return
+        users = with_ledger_balances(
+            User.objects.order_by('id'), until_entry=last_entry
+        ).filter(Exists(LedgerEntry.objects.filter(
+            user=OuterRef('pk'), id__gt=OuterRef('snapshot_entry'),
+            id__lte=last_entry)))
+        chunk_size = options['chunk_size']
+        snapshots, created = [], 0
+        for user_id, balance, freeze_balance in users.values_list(
+                'id', 'ledger_balance', 'ledger_freeze').iterator(chunk_size):
+            snapshots.append(BalanceSnapshot(
+                user_id=user_id, last_entry_id=last_entry,
+                balance=balance, freeze_balance=freeze_balance))
+            if len(snapshots) >= chunk_size:
+                created += len(BalanceSnapshot.objects.bulk_create(snapshots))
+                snapshots = []
+        created += len(BalanceSnapshot.objects.bulk_create(snapshots))
+        self.stdout.write(f'{created} snapshots at entry {last_entry}')
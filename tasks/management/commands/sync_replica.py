@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from freelance1.replicas import copy_database
+
+
+class Command(BaseCommand):
+    help = ('Копирует default в реплики SQLite (REPLICA_DATABASES или '
+            '--database) - замена репликации для локальной разработки. '
+            'С --interval повторяет копирование, пока не прервут.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', nargs='+',
+                            help='Алиасы реплик из DATABASES.')
+        parser.add_argument('--interval', type=float,
+                            help='Секунд между копированиями.')
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or settings.REPLICA_DATABASES
+        if not aliases:
+            raise CommandError('No replicas: set REPLICA_DATABASES or pass '
+                               '--database.')
+        for alias in aliases:
+            if alias not in connections or alias == DEFAULT_DB_ALIAS:
+                raise CommandError(f'Unknown replica {alias!r}.')
+        while True:
+            started = time.perf_counter()
+            for alias in aliases:
+                try:
+                    copy_database(connections[DEFAULT_DB_ALIAS],
+                                  connections[alias])
+                except ValueError as error:
+                    raise CommandError(error)
+            self.stdout.write(f'synced {", ".join(aliases)} in '
+                              f'{time.perf_counter() - started:.2f}s')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
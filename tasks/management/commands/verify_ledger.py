@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from tasks.ledger import with_ledger_balances
+from tasks.models import LedgerEntry
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сверяет balance и freeze_balance всех пользователей с журналом '
+            'проводок за один потоковый проход.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        mismatches = checked = 0
+        with transaction.atomic():
+            users = with_ledger_balances(User.objects.order_by('id'))
+            rows = users.values_list(
+                'id', 'balance', 'freeze_balance',
+                'ledger_balance', 'ledger_freeze',
+            ).iterator(options['chunk_size'])
+            for user_id, balance, freeze, ledger_balance, ledger_freeze in rows:
+                checked += 1
+                if (balance, freeze) != (ledger_balance, ledger_freeze):
+                    mismatches += 1
+                    self.stdout.write(
+                        f'user {user_id}: balance {balance} '
+                        f'(ledger {ledger_balance}), freeze {freeze} '
+                        f'(ledger {ledger_freeze})')
+            unbalanced = (LedgerEntry.objects.values('operation')
+                          .annotate(total=Sum('amount'))
+                          .exclude(total=0).count())
+        if unbalanced:
+            self.stdout.write(f'{unbalanced} operations do not sum to zero')
+        if mismatches or unbalanced:
+            raise CommandError(f'{mismatches} of {checked} users do not '
+                               f'reconcile with the ledger')
+        self.stdout.write(f'{checked} users reconcile with the ledger')
@@ -0,0 +1,77 @@
+# Generated by Django 3.2 on 2026-10-18 09:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=30, verbose_name='Title')),
+                ('text', models.TextField(default='', null=True, verbose_name='Text')),
+                ('status', models.CharField(choices=[('active', 'Active'), ('in_progress', 'In Progress'), ('done', 'Done'), ('abandoned', 'Abandoned')], default='active', max_length=15)),
+                ('price', models.DecimalField(decimal_places=0, default=500, max_digits=10)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_authors', to=settings.AUTH_USER_MODEL, verbose_name='Author')),
+                ('executor', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_executors', to=settings.AUTH_USER_MODEL, verbose_name='Executor')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now=True)),
+                ('price', models.DecimalField(decimal_places=0, default=0, max_digits=10)),
+                ('status', models.CharField(choices=[('Success', 'Success'), ('Fail', 'Fail')], max_length=10)),
+                ('author', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactions_author', to=settings.AUTH_USER_MODEL)),
+                ('executor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactions_executor', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='tasks.task')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Respond',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responds', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responds', to='tasks.task')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(default='', null=True, verbose_name='Text')),
+                ('path', models.CharField(default='', editable=False, max_length=1000)),
+                ('depth', models.PositiveIntegerField(default=0, editable=False)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='tasks.comment')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='tasks.task')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['path'], name='comment_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', 'depth', 'path'], name='comment_task_depth_path_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-18 09:51
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_responds(apps, schema_editor):
+    Respond = apps.get_model('tasks', 'Respond')
+    keep = (Respond.objects.values('task', 'author')
+            .annotate(keep_id=Min('id')).values('keep_id'))
+    Respond.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'price'], name='task_status_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'id'], name='task_status_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['author', 'status'], name='task_author_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(executor__isnull=False), fields=['executor', 'status'], name='task_executor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['author', '-created'], name='transaction_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['executor', '-created'], name='transaction_executor_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_responds,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='respond',
+            constraint=models.UniqueConstraint(fields=('task', 'author'), name='unique_respond_per_executor'),
+        ),
+    ]
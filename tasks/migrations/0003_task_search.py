@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from tasks.search import drop_search_index, install_search_index
+
+
+def forwards(apps, schema_editor):
+    install_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_marketplace_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
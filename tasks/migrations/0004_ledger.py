@@ -0,0 +1,81 @@
+# Generated by Django 3.2 on 2026-10-18 10:03
+
+import uuid
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_accounts(apps, schema_editor):
+    # Начальные проводки, чтобы журнал сошёлся с уже существующими балансами.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    LedgerEntry = apps.get_model('tasks', 'LedgerEntry')
+    entries = []
+    for user_id, balance, freeze_balance in User.objects.exclude(
+            balance=0, freeze_balance=0).values_list(
+                'id', 'balance', 'freeze_balance').iterator():
+        operation = uuid.uuid4()
+        for account, amount in (('balance', balance),
+                                ('freeze', freeze_balance)):
+            if amount:
+                entries.append(LedgerEntry(operation=operation,
+                                           user_id=user_id,
+                                           account=account, amount=amount))
+                entries.append(LedgerEntry(operation=operation,
+                                           account='external',
+                                           amount=-amount))
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0003_task_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.UUIDField()),
+                ('account', models.CharField(choices=[('balance', 'Balance'), ('freeze', 'Freeze'), ('external', 'External')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=0, max_digits=12)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('task', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='tasks.task')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_entry_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=0, max_digits=12)),
+                ('freeze_balance', models.DecimalField(decimal_places=0, max_digits=12)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-last_entry_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['user', 'account', 'id'], name='ledger_user_account_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['operation'], name='ledger_operation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='balancesnapshot',
+            index=models.Index(fields=['user', '-last_entry_id'], name='snapshot_user_entry_idx'),
+        ),
+        migrations.RunPython(open_accounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 10:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from tasks.search import install_search_index
+
+
+def fill_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+
+    def count_per_task(model_name):
+        model = apps.get_model('tasks', model_name)
+        counts = (model.objects.filter(task=OuterRef('pk')).order_by()
+                  .values('task').annotate(count=Count('id'))
+                  .values('count'))
+        return Coalesce(Subquery(counts), 0)
+
+    Task.objects.update(respond_count=count_per_task('Respond'),
+                        comment_count=count_per_task('Comment'))
+
+
+def restore_search_index(apps, schema_editor):
+    # AddField на SQLite пересоздаёт таблицу задач вместе с триггерами.
+    install_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='respond_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+from tasks.search import install_search_index
+
+
+def restore_search_index(apps, schema_editor):
+    # AddField на SQLite пересоздаёт таблицу задач вместе с триггерами.
+    install_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(restore_search_index, migrations.RunPython.noop),
+    ]
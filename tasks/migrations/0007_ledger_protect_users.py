@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 11:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balancesnapshot',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='balance_snapshots', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
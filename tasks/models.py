@@ -1,5 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -26,12 +30,51 @@ class Task(models.Model):
         default=TaskStatuses.ACTIVE,
     )
     price = models.DecimalField(default=500, max_digits=10, decimal_places=0)
+    respond_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'price'],
+                         name='task_status_price_idx'),
+            models.Index(fields=['status', 'id'],
+                         name='task_status_id_idx'),
+            models.Index(fields=['author', 'status'],
+                         name='task_author_status_idx'),
+            models.Index(fields=['executor', 'status'],
+                         condition=Q(executor__isnull=False),
+                         name='task_executor_status_idx'),
+        ]
+
+
+PATH_WIDTH = 10
+PATH_SEPARATOR = '/'
+PATH_UPPER_BOUND = chr(ord(PATH_SEPARATOR) + 1)
+
+
+def subtree_range(path):
+    """Границы [start, end) путей всех потомков узла с путём `path`."""
+    return path, path[:-1] + PATH_UPPER_BOUND
+
+
+class CommentQuerySet(models.QuerySet):
+    def subtree(self, path, max_depth=None):
+        start, end = subtree_range(path)
+        queryset = self.filter(path__gte=start, path__lt=end)
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=max_depth)
+        return queryset
+
+    def reply_counts(self):
+        return (self.annotate(root=Substr('path', 1, PATH_WIDTH))
+                .values('root')
+                .annotate(replies=Count('id') - 1)
+                .order_by('root'))
 
 
 class Comment(models.Model):
@@ -42,11 +85,72 @@ class Comment(models.Model):
     parent = models.ForeignKey('self', on_delete=models.SET_NULL,
                                null=True, blank=True,
                                related_name='children')
+    path = models.CharField(max_length=1000, default='', editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['path'], name='comment_path_idx'),
+            models.Index(fields=['task', 'depth', 'path'],
+                         name='comment_task_depth_path_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_parent_id = instance.parent_id
+        return instance
+
+    @staticmethod
+    def build_path(comment_id, parent_path=''):
+        return f'{parent_path}{comment_id:0{PATH_WIDTH}d}{PATH_SEPARATOR}'
 
     @property
     def root_comments(self):
         return self.comments.filter(parent=None)
 
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            super().save(*args, **kwargs)
+            self._place()
+            Comment.objects.filter(pk=self.pk).update(path=self.path,
+                                                      depth=self.depth)
+        elif self.parent_id != getattr(self, '_saved_parent_id',
+                                       self.parent_id):
+            old_path, old_depth = self.path, self.depth
+            self._place()
+            if self.path.startswith(old_path):
+                raise ValidationError('Comment cannot be moved '
+                                      'into its own subtree')
+            super().save(*args, **kwargs)
+            self.rebase_subtree(old_path, self.path, self.depth - old_depth)
+        else:
+            super().save(*args, **kwargs)
+        self._saved_parent_id = self.parent_id
+
+    def _place(self):
+        parent = self.parent
+        if parent is None:
+            self.path, self.depth = self.build_path(self.pk), 0
+        else:
+            self.path = self.build_path(self.pk, parent.path)
+            self.depth = parent.depth + 1
+
+    @staticmethod
+    def rebase_subtree(old_path, new_path, depth_shift, include_root=True):
+        """Переносит всех потомков `old_path` под префикс `new_path`."""
+        queryset = Comment.objects.subtree(old_path)
+        if not include_root:
+            queryset = queryset.exclude(path=old_path)
+        queryset.update(
+            path=Concat(Value(new_path),
+                        Substr('path', len(old_path) + 1)),
+            depth=F('depth') + depth_shift,
+            updated_at=timezone.now())
+
 
 class Respond(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE,
@@ -56,6 +160,18 @@ class Respond(models.Model):
 
     class Meta:
         ordering = ['-id']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'author'],
+                                    name='unique_respond_per_executor'),
+        ]
+
+
+class TransactionQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Персонал видит все транзакции, остальные - только свои."""
+        if user.is_staff:
+            return self
+        return self.filter(Q(author_id=user.id) | Q(executor_id=user.id))
 
 
 class Transaction(models.Model):
@@ -78,5 +194,58 @@ class Transaction(models.Model):
     price = models.DecimalField(default=0, max_digits=10, decimal_places=0)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
 
+    objects = TransactionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['author', '-created'],
+                         name='transaction_author_idx'),
+            models.Index(fields=['executor', '-created'],
+                         name='transaction_executor_idx'),
+        ]
+
+
+class LedgerAccount(models.TextChoices):
+    BALANCE = 'balance'
+    FREEZE = 'freeze'
+    EXTERNAL = 'external'
+
+
+class LedgerEntry(models.Model):
+    """Неизменяемая проводка. Проводки одной операции дают в сумме ноль."""
+    operation = models.UUIDField()
+    # Журнал только дописывается: пользователя с проводками не удалить.
+    user = models.ForeignKey(User, on_delete=models.PROTECT,
+                             null=True,
+                             related_name='ledger_entries')
+    account = models.CharField(max_length=10, choices=LedgerAccount.choices)
+    amount = models.DecimalField(max_digits=12, decimal_places=0)
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL,
+                             null=True,
+                             related_name='ledger_entries')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'account', 'id'],
+                         name='ledger_user_account_idx'),
+            models.Index(fields=['operation'], name='ledger_operation_idx'),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    user = models.ForeignKey(User, on_delete=models.PROTECT,
+                             related_name='balance_snapshots')
+    last_entry_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=12, decimal_places=0)
+    freeze_balance = models.DecimalField(max_digits=12, decimal_places=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-last_entry_id']
+        indexes = [
+            models.Index(fields=['user', '-last_entry_id'],
+                         name='snapshot_user_entry_idx'),
+        ]
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset-пагинация по -id: без COUNT(*) и OFFSET."""
+    ordering = '-id'
+
+
+def task_list_paginator(request):
+    """Пагинатор ленты задач для синхронной и async-вью.
+
+    Результаты поиска упорядочены по релевантности, а не по -id,
+    поэтому для них нужна постраничная пагинация.
+    """
+    if request is not None and request.query_params.get('search'):
+        return PageNumberPagination()
+    return IdCursorPagination()
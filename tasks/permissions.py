@@ -10,7 +10,7 @@ class IsAuthor(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return request.user.is_authenticated
-        return obj.author == request.user
+        return obj.author_id == request.user.id
 
 
 class IsExecutor(BasePermission):
@@ -0,0 +1,131 @@
+"""Полнотекстовый поиск по title и text задач.
+
+На SQLite используется внешняя FTS5-таблица, которую синхронизируют
+триггеры; на PostgreSQL - tsvector с GIN-индексом по тому же выражению.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.models import Q
+
+FTS_TABLE = 'tasks_task_fts'
+SEARCH_CONFIG = 'simple'
+
+SQLITE_FTS_TABLE = f'''
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+USING fts5(title, text, content='tasks_task', content_rowid='id')
+'''
+SQLITE_FTS_TRIGGERS = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks_task
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks_task
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, text ON tasks_task
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    ''',
+)
+POSTGRES_SEARCH_INDEX = f'''
+CREATE INDEX IF NOT EXISTS task_search_idx ON tasks_task USING GIN (
+    to_tsvector('{SEARCH_CONFIG}'::regconfig,
+                COALESCE(title, '') || ' ' || COALESCE(text, ''))
+)
+'''
+
+
+def install_search_index(schema_editor):
+    """Создаёт (или восстанавливает) поисковый индекс задач.
+
+    SQLite пересоздаёт таблицу при изменении её схемы и теряет триггеры,
+    поэтому миграции, меняющие Task, должны вызывать эту функцию снова.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_FTS_TABLE)
+        for trigger in SQLITE_FTS_TRIGGERS:
+            schema_editor.execute(trigger)
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_SEARCH_INDEX)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS task_search_idx')
+
+
+@contextmanager
+def deferred_search_index(connection):
+    """Массовая вставка задач без построчного обновления индекса.
+
+    На SQLite триггер вставки снимается, а в конце индекс перестраивается
+    целиком - это в разы быстрее. Задачи, вставленные в это время другими
+    соединениями, тоже попадут в индекс при перестроении.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(SQLITE_FTS_TRIGGERS[0])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def fts_query(value):
+    """Превращает пользовательский ввод в безопасный FTS5-запрос."""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', value))
+
+
+def search_tasks(queryset, value):
+    """Фильтрует задачи по тексту и сортирует их по релевантности."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        query = fts_query(value)
+        if not query:
+            return queryset.none()
+        return queryset.extra(
+            select={'search_rank': f'{FTS_TABLE}.rank'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = tasks_task.id',
+                   f'{FTS_TABLE} MATCH %s'],
+            params=[query],
+        ).order_by('search_rank', '-id')
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+        vector = SearchVector('title', 'text', config=SEARCH_CONFIG)
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        return (queryset.annotate(search=vector,
+                                  search_rank=SearchRank(vector, query))
+                .filter(search=query)
+                .order_by('-search_rank', '-id'))
+    return queryset.filter(Q(title__icontains=value) |
+                           Q(text__icontains=value))
@@ -1,10 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
+from . import events, ledger
 from .exceptions import BalanceTransferError
-from .helpers import TransactionCreation
-from .models import Task, Respond, Comment
+from .helpers import (TransactionCreation, prefetch_task_comments,
+                      transaction_batch)
+from .models import Task, Respond, Comment, Transaction
 
 User = get_user_model()
 
@@ -37,24 +40,21 @@ class TasksSerializer(serializers.ModelSerializer):
         slug_field='username',
         read_only=True
     )
-    comments = CommentSerializer(many=True)
+    comments = CommentSerializer(many=True, read_only=True)
+
+    def to_representation(self, instance):
+        prefetch_task_comments(instance)
+        return super().to_representation(instance)
 
     def create(self, validated_data):
-        request = self.context['request']
-        if validated_data['price'] > request.user.balance:
-            raise serializers.ValidationError(
-                'Not enough money on your balance')
-        task_price = validated_data['price']
-        instance = Task.objects.select_for_update().create(**validated_data)
-        transaction_log = TransactionCreation(instance)
         try:
-            with transaction.atomic():
-                instance.author.balance -= task_price
-                instance.author.freeze_balance += task_price
-                instance.author.save()
-                transaction_log.create_transaction_success()
+            with transaction_batch():
+                instance = Task.objects.create(**validated_data)
+                ledger.freeze(instance.author_id, instance.price, instance)
+                TransactionCreation(instance).create_transaction_success()
         except BalanceTransferError:
-            transaction_log.create_transaction_fail()
+            raise serializers.ValidationError(
+                'Not enough money on your balance')
         return instance
 
     def update(self, instance, validated_data):
@@ -62,13 +62,25 @@ class TasksSerializer(serializers.ModelSerializer):
         if instance.status == DONE:
             raise serializers.ValidationError('Task is already done')
         elif validated_data.get('status') != DONE:
+            old_price = instance.price
             instance.author = validated_data.get('author', instance.author)
             instance.executor = validated_data.get('executor',
                                                    instance.executor)
             instance.title = validated_data.get('title', instance.title)
             instance.text = validated_data.get('text', instance.text)
             instance.price = validated_data.get('price', instance.price)
-            instance.save()
+            try:
+                with transaction.atomic():
+                    ledger.refreeze(instance.author_id, old_price,
+                                    instance.price, instance)
+                    # Счётчики откликов и комментариев меняются через F(),
+                    # поэтому из прочитанной раньше задачи их не пишем.
+                    instance.save(update_fields=[
+                        'author', 'executor', 'title', 'text', 'price',
+                        'updated_at'])
+            except BalanceTransferError:
+                raise serializers.ValidationError(
+                    'Not enough money on your balance')
         elif (instance.executor is None and
               validated_data.get('status') == DONE):
             transaction_log.create_transaction_fail()
@@ -77,18 +89,24 @@ class TasksSerializer(serializers.ModelSerializer):
         elif (instance.executor is not None and
               validated_data.get('status') == DONE):
             try:
-                with transaction.atomic():
-                    instance.status = validated_data.get('status',
-                                                         instance.status)
-                    instance.author.freeze_balance -= instance.price
-                    instance.executor.balance += instance.price
-                    instance.author.save()
-                    instance.executor.save()
-                    instance.save()
+                with transaction_batch():
+                    settled = Task.objects.filter(pk=instance.pk).exclude(
+                        status=DONE).update(status=DONE,
+                                            updated_at=timezone.now())
+                    if not settled:
+                        raise serializers.ValidationError(
+                            'Task is already done')
+                    ledger.payout(instance.author_id, instance.executor_id,
+                                  instance.price, instance)
                     transaction_log.create_transaction_success(
                         instance.executor)
+                    events.publish(events.TASK_DONE, task=instance.pk,
+                                   executor=instance.executor_id)
             except BalanceTransferError:
                 transaction_log.create_transaction_fail(instance.executor)
+                raise serializers.ValidationError(
+                    'Not enough frozen money to pay the executor')
+            instance.status = DONE
         return instance
 
     class Meta:
@@ -96,6 +114,36 @@ class TasksSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class SettleSerializer(serializers.Serializer):
+    tasks = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class TaskListSerializer(serializers.ModelSerializer):
+    """Компактное представление задачи для ленты."""
+    author = serializers.SlugRelatedField(
+        slug_field='username',
+        read_only=True
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request and request.query_params.get('fields')
+        if fields:
+            allowed = set(fields.split(','))
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+    class Meta:
+        model = Task
+        fields = ('id', 'title', 'price', 'status', 'author',
+                  'comment_count', 'respond_count')
+
+
 class RespondsSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         default=serializers.CurrentUserDefault(),
@@ -110,3 +158,9 @@ class RespondsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Respond
         fields = '__all__'
+
+
+class TransactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Transaction
+        fields = '__all__'
@@ -0,0 +1,74 @@
+"""Массовое завершение задач (статус DONE) с выплатой исполнителям."""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import events, ledger
+from .exceptions import BalanceTransferError
+from .helpers import TransactionCreation, log_transactions, transaction_batch
+from .models import Task, TaskStatuses, Transaction
+
+User = get_user_model()
+
+
+def settle_tasks(task_ids, user):
+    """Завершает задачи пачкой и возвращает (settled_ids, errors).
+
+    Проверки выполняются заранее по одному запросу на задачи и балансы,
+    деньги двигаются set-based UPDATE-ами, журнал и Transaction пишутся
+    через bulk_create. Вся пачка - одна транзакция; ошибки по отдельным
+    задачам не мешают остальным.
+    """
+    tasks = Task.objects.filter(pk__in=task_ids).only(
+        'id', 'author_id', 'executor_id', 'price', 'status').in_bulk()
+    errors = {}
+    failed = []
+    payable = []
+    for task_id in dict.fromkeys(task_ids):
+        task = tasks.get(task_id)
+        if task is None or (task.author_id != user.id and not user.is_staff):
+            errors[task_id] = 'Not found'
+        elif task.status == TaskStatuses.DONE:
+            errors[task_id] = 'Task is already done'
+        elif task.executor_id is None:
+            errors[task_id] = 'Choose executor before making status DONE'
+            failed.append(TransactionCreation(task).build(Transaction.FAIL))
+        else:
+            payable.append(task)
+
+    frozen = dict(User.objects.filter(
+        pk__in={task.author_id for task in payable}
+    ).values_list('id', 'freeze_balance'))
+    spent = defaultdict(int)
+    settled = []
+    for task in payable:
+        if spent[task.author_id] + task.price > frozen[task.author_id]:
+            errors[task.id] = 'Not enough frozen money to pay the executor'
+            failed.append(TransactionCreation(task).build(
+                Transaction.FAIL, task.executor_id))
+            continue
+        spent[task.author_id] += task.price
+        settled.append(task)
+
+    try:
+        with transaction_batch():
+            updated = Task.objects.filter(
+                pk__in=[task.id for task in settled]
+            ).exclude(status=TaskStatuses.DONE).update(
+                status=TaskStatuses.DONE, updated_at=timezone.now())
+            if updated != len(settled):
+                raise BalanceTransferError('Tasks changed concurrently')
+            ledger.bulk_payout((task.author_id, task.executor_id,
+                                task.price, task.id) for task in settled)
+            log_transactions(*(TransactionCreation(task).build(
+                Transaction.SUCCESS, task.executor_id) for task in settled))
+            for task in settled:
+                events.publish(events.TASK_DONE, task=task.id,
+                               executor=task.executor_id)
+    except BalanceTransferError:
+        raise serializers.ValidationError(
+            'Balances or tasks changed during settlement, retry the batch')
+    log_transactions(*failed)
+    return [task.id for task in settled], errors
@@ -0,0 +1,59 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.cache import invalidate_me
+from .models import Comment, Respond, Task
+
+COUNTERS = {
+    Comment: 'comment_count',
+    Respond: 'respond_count',
+}
+
+
+@receiver(pre_delete, sender=Comment)
+def detach_comment_children(sender, instance, **kwargs):
+    # Дети удалённого комментария становятся корнями (SET_NULL),
+    # поэтому их пути теряют префикс родителя. Путь перечитывается из БД:
+    # при удалении пачки предок уже мог сдвинуть это поддерево.
+    current = Comment.objects.filter(pk=instance.pk).values_list(
+        'path', 'depth').first()
+    if current is not None and current[0]:
+        path, depth = current
+        Comment.rebase_subtree(path, '', -(depth + 1), include_root=False)
+
+
+def touch_task(task_id, **changes):
+    """Сдвигает updated_at задачи, по которому считаются её ETag."""
+    if task_id is not None:
+        Task.objects.filter(pk=task_id).update(updated_at=timezone.now(),
+                                               **changes)
+
+
+def change_counter(model, instance, delta):
+    field = COUNTERS[model]
+    touch_task(instance.task_id, **{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Respond)
+def increment_task_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(sender, instance, 1)
+    elif sender is Comment:
+        # Правка комментария меняет дерево в ответе задачи.
+        touch_task(instance.task_id)
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Respond)
+def decrement_task_counter(sender, instance, **kwargs):
+    change_counter(sender, instance, -1)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_users(sender, instance, **kwargs):
+    # Число открытых задач входит в закэшированный профиль /me.
+    invalidate_me(instance.author_id, instance.executor_id)
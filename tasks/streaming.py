@@ -0,0 +1,81 @@
+"""SSE-поток событий биржи как отдельное ASGI-приложение.
+
+Подключается в freelance1/asgi.py на EVENTS_STREAM_PATH; одно
+соединение заменяет периодический опрос ленты задач и откликов.
+Токен передаётся заголовком Authorization или параметром ?token=
+(EventSource не умеет ставить заголовки).
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.authentication import ClaimsJWTAuthentication
+from .events import get_broker, matches, parse_filters
+
+EVENTS_STREAM_PATH = '/tasks/v1/events/stream/'
+
+
+def format_event(event):
+    return (f"id: {event['id']}\nevent: {event['type']}\n"
+            f"data: {json.dumps(event['data'])}\n\n").encode()
+
+
+@sync_to_async
+def authenticate(raw_token):
+    # Токен без claims требует чтения пользователя из БД.
+    auth = ClaimsJWTAuthentication()
+    return auth.get_user(auth.get_validated_token(raw_token))
+
+
+async def respond(send, status, body=b''):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def sse_app(scope, receive, send):
+    headers = dict(scope['headers'])
+    params = {key: values[-1] for key, values in
+              parse_qs(scope['query_string'].decode()).items()}
+    authorization = headers.get(b'authorization', b'').split()
+    raw_token = (authorization[1] if len(authorization) == 2
+                 else params.get('token', '').encode())
+    try:
+        await authenticate(raw_token)
+    except AuthenticationFailed:
+        return await respond(send, 401, b'Authentication required')
+
+    broker = get_broker()
+    types, task = parse_filters(params.get('types'), params.get('task'))
+    last_event_id = headers.get(b'last-event-id', b'').decode()
+    after = (int(last_event_id) if last_event_id.isdigit()
+             else broker.last_id())
+
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'),
+                            (b'cache-control', b'no-cache'),
+                            (b'x-accel-buffering', b'no')]})
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        while True:
+            waiting = asyncio.ensure_future(
+                broker.wait_async(after, settings.SSE_KEEPALIVE))
+            await asyncio.wait({waiting, disconnected},
+                               return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                waiting.cancel()
+                break
+            events = waiting.result()
+            body = b''.join(format_event(event) for event in events
+                            if matches(event, types, task))
+            if events:
+                after = events[-1]['id']
+            await send({'type': 'http.response.body',
+                        'body': body or b': keepalive\n\n',
+                        'more_body': True})
+    finally:
+        disconnected.cancel()
@@ -1,10 +1,14 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from rest_framework.routers import DefaultRouter
 
-from .views import TasksViewSet, RespondViewSet, CommentsViewSet
+from . import async_views
+from .views import (TasksViewSet, RespondViewSet, CommentsViewSet,
+                    EventsView, ExportView, TransactionViewSet)
 
 router_v1 = DefaultRouter()
+router_v1.register('transactions', TransactionViewSet,
+                   basename='transactions')
 router_v1.register('', TasksViewSet, basename='tasks')
 router_v1.register(r'(?P<task_id>\d+)/comment', CommentsViewSet, basename='comments')
 router_v1.register(r'(?P<task_id>\d+)/respond',
@@ -12,5 +16,13 @@ router_v1.register(r'(?P<task_id>\d+)/respond',
                    basename='respond')
 
 urlpatterns = [
+    path('v1/events/', EventsView.as_view(), name='events'),
+    re_path(r'^v1/export/(?P<kind>\w+)\.(?P<fmt>csv|jsonl)$',
+            ExportView.as_view(), name='export'),
+    path('v1/async/', async_views.task_list, name='async-tasks-list'),
+    path('v1/async/<int:pk>/', async_views.task_detail,
+         name='async-tasks-detail'),
+    path('v1/async/<int:task_id>/comment/', async_views.comment_list,
+         name='async-comments-list'),
     path('v1/', include(router_v1.urls)),
 ]
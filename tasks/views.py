@@ -1,26 +1,101 @@
+import time
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import AllowAny, SAFE_METHODS
+from rest_framework.permissions import AllowAny, IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.cache import invalidate_me
 
-from .helpers import TransactionCreation
-from .models import Task, Respond, Comment
+from . import events, exporter, ledger
+from .conditional import conditional_get, task_list_version, task_version
+from .exceptions import BalanceTransferError
+from .filters import TaskFilter
+from .helpers import TransactionCreation, load_comment_tree
+from .models import Task, TaskStatuses, Comment, Transaction
+from .pagination import IdCursorPagination, task_list_paginator
 from .permissions import IsAuthor, IsExecutor
-from .serializers import TasksSerializer, RespondsSerializer, CommentSerializer, CreateCommentSerializer
+from .serializers import (TasksSerializer, TaskListSerializer, RespondsSerializer,
+                          CommentSerializer, CreateCommentSerializer,
+                          SettleSerializer, TransactionSerializer)
+from .settlement import settle_tasks
 
 User = get_user_model()
 
 
 class TasksViewSet(viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+    queryset = Task.objects.select_related('author').prefetch_related(
+        Prefetch('comments', queryset=Comment.objects.order_by('id')))
     serializer_class = TasksSerializer
     permission_classes = (IsAuthor,)
+    pagination_class = IdCursorPagination
+    filterset_class = TaskFilter
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            self._paginator = task_list_paginator(self.request)
+        return self._paginator
+
+    def is_compact_list(self):
+        return (self.action == 'list' and
+                'comments' not in self.request.query_params.get(
+                    'expand', '').split(','))
+
+    def get_queryset(self):
+        if self.is_compact_list():
+            return Task.objects.select_related('author')
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.is_compact_list():
+            return TaskListSerializer
+        return TasksSerializer
+
+    @conditional_get(task_list_version)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(task_version)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user,
-                        executor=None)
+        task = serializer.save(author_id=self.request.user.id,
+                               executor=None)
+        events.publish(events.TASK_CREATED, task=task.id, title=task.title,
+                       price=str(task.price), author=task.author_id)
+
+    @action(detail=False, methods=['post'])
+    def settle(self, request):
+        serializer = SettleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        settled, errors = settle_tasks(serializer.validated_data['tasks'],
+                                       request.user)
+        return Response({'settled': settled, 'errors': errors},
+                        status=status.HTTP_200_OK)
+
+    def perform_destroy(self, instance):
+        # Деньги незавершённой задачи возвращаются автору.
+        try:
+            with transaction.atomic():
+                if instance.status != TaskStatuses.DONE:
+                    ledger.release(instance.author_id, instance.price,
+                                   instance)
+                instance.delete()
+        except BalanceTransferError:
+            raise ValidationError('Frozen balance does not cover the task')
 
 
 class CommentsViewSet(viewsets.ModelViewSet):
@@ -34,8 +109,52 @@ class CommentsViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         task = get_object_or_404(Task, pk=self.kwargs.get('task_id'))
+        if self.action == 'subtree':
+            return task.comments.all()
         return task.comments.filter(parent=None)
 
+    def get_depth(self):
+        depth = self.request.query_params.get('depth')
+        if depth is None:
+            return None
+        if not depth.isdigit():
+            raise ValidationError({'depth': 'Must be a non-negative integer'})
+        return int(depth)
+
+    @conditional_get(task_version)
+    def list(self, request, *args, **kwargs):
+        depth = self.get_depth()
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(load_comment_tree(page, depth),
+                                             many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(load_comment_tree(queryset, depth),
+                                         many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance, = load_comment_tree([self.get_object()])
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    @action(detail=True)
+    def subtree(self, request, **kwargs):
+        depth = self.get_depth()
+        comment = self.get_object()
+        max_depth = None if depth is None else comment.depth + depth
+        comment, = load_comment_tree([comment], max_depth)
+        serializer = self.get_serializer(comment)
+        return Response(serializer.data)
+
+    @action(detail=False, url_path='reply-counts')
+    def reply_counts(self, request, **kwargs):
+        task = get_object_or_404(Task, pk=self.kwargs.get('task_id'))
+        counts = [{'id': int(row['root']), 'replies': row['replies']}
+                  for row in task.comments.reply_counts()]
+        return Response(counts, status=status.HTTP_200_OK)
+
     def perform_create(self, serializer):
         task = get_object_or_404(Task, pk=self.kwargs.get('task_id'))
         serializer.save(task=task)
@@ -44,6 +163,7 @@ class CommentsViewSet(viewsets.ModelViewSet):
 class RespondViewSet(viewsets.ModelViewSet):
     serializer_class = RespondsSerializer
     permission_classes = (IsExecutor,)
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         task = get_object_or_404(Task, pk=self.kwargs.get('task_id'))
@@ -51,7 +171,18 @@ class RespondViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         task = get_object_or_404(Task, pk=self.kwargs.get('task_id'))
-        serializer.save(author=self.request.user, task=task)
+        error = 'You have already responded to this task'
+        if task.responds.filter(author_id=self.request.user.id).exists():
+            raise ValidationError(error)
+        # Параллельный дубль проходит проверку и упирается в unique.
+        try:
+            with transaction.atomic():
+                respond = serializer.save(author_id=self.request.user.id,
+                                          task=task)
+        except IntegrityError:
+            raise ValidationError(error)
+        events.publish(events.RESPOND_CREATED, task=task.id,
+                       respond=respond.id, author=respond.author_id)
 
     @action(detail=False,
             methods=['patch'],
@@ -59,12 +190,98 @@ class RespondViewSet(viewsets.ModelViewSet):
             url_path=r'(?P<respond_id>\d+)/winner')
     def winner(self, request, **kwargs):
         task = get_object_or_404(Task, pk=self.kwargs.get('task_id'))
-        respond = get_object_or_404(Respond, pk=self.kwargs.get('respond_id'))
+        # Исполнителя выбирает только автор задачи и только из её откликов.
+        self.check_object_permissions(request, task)
+        respond = get_object_or_404(task.responds,
+                                    pk=self.kwargs.get('respond_id'))
         transaction_log = TransactionCreation(task)
-        if task.executor is not None:
+        # Условный UPDATE: из параллельных запросов исполнителя назначит
+        # только один.
+        chosen = task.executor_id is None and Task.objects.filter(
+            pk=task.pk, executor=None).update(
+            executor=respond.author_id, status=TaskStatuses.IN_PROGRESS,
+            updated_at=timezone.now())
+        task.refresh_from_db()
+        if not chosen:
             transaction_log.create_transaction_fail(task.executor)
             return Response(f'Executor is already chosen: {task.executor}')
-        task.executor = respond.author
-        task.status = 'in_progress'
+        invalidate_me(task.author_id, task.executor_id)
+        events.publish(events.WINNER_CHOSEN, task=task.id,
+                       executor=task.executor_id)
         serializer = TasksSerializer(task)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = TransactionSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        return Transaction.objects.visible_to(self.request.user)
+
+
+class EventsView(APIView):
+    """Long-poll ленты событий для клиентов без SSE.
+
+    Ждёт события с id больше ?after (по умолчанию - только новые) не
+    дольше ?timeout секунд и возвращает их вместе с last_id, с которым
+    нужно прийти в следующий раз.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        broker = events.get_broker()
+        types, task = events.parse_filters(request.query_params.get('types'),
+                                           request.query_params.get('task'))
+        after = request.query_params.get('after', '')
+        after = int(after) if after.isdigit() else broker.last_id()
+        timeout = request.query_params.get('timeout', '')
+        timeout = min(int(timeout) if timeout.isdigit()
+                      else settings.LONG_POLL_TIMEOUT,
+                      settings.LONG_POLL_TIMEOUT)
+        deadline = time.monotonic() + timeout
+        found = []
+        while not found:
+            remaining = deadline - time.monotonic()
+            batch = broker.wait(after, max(remaining, 0))
+            if batch:
+                after = batch[-1]['id']
+            found = [event for event in batch
+                     if events.matches(event, types, task)]
+            if remaining <= 0:
+                break
+        return Response({'events': found, 'last_id': after},
+                        status=status.HTTP_200_OK)
+
+
+class ExportView(APIView):
+    """Полная выгрузка /v1/export/<kind>.<csv|jsonl> одним потоком.
+
+    Фильтры - ?since, ?until, ?user, ?status. Ответ сжимается gzip на
+    лету, если клиент прислал Accept-Encoding: gzip.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # Тело отдаётся в обход рендереров, Accept: text/csv не должен
+        # приводить к 406.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, kind, fmt):
+        if kind not in exporter.EXPORTS:
+            raise NotFound()
+        gzip = bool(re_accepts_gzip.search(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        chunks, errors = exporter.export(kind, fmt, request.query_params,
+                                         user=request.user, gzip=gzip)
+        if errors:
+            raise ValidationError(errors)
+        response = StreamingHttpResponse(
+            chunks, content_type=exporter.CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.{fmt}"')
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
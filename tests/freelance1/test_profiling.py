@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from freelance1.profiling import RollingHistogram, registry
+from tasks.models import Task
+
+User = get_user_model()
+
+
+class RollingHistogramTest(APITestCase):
+    def test_old_slots_expire(self):
+        histogram = RollingHistogram((1, 10), window=10, slots=10)
+        histogram.observe(0.5, now=0)
+        histogram.observe(5, now=5)
+        histogram.observe(50, now=5)
+        self.assertEqual(histogram.snapshot(now=5), ([1, 2, 3], 55.5, 3))
+        self.assertEqual(histogram.snapshot(now=12), ([0, 1, 2], 55, 2))
+
+
+@override_settings(PROFILING=True, PROFILING_QUERY_BUDGET=1)
+class ProfilingMiddlewareTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@gmail.com', role='author')
+        cls.staff = User.objects.create_user(
+            username='staff', email='staff@gmail.com', is_staff=True)
+        Task.objects.create(author=cls.author, title='title')
+
+    def setUp(self):
+        registry.clear()
+        self.client = APIClient()
+
+    def test_metrics(self):
+        self.client.force_authenticate(user=self.author)
+        with self.assertLogs('freelance1.profiling', 'WARNING'):
+            self.client.get(reverse('tasks-list'))
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code,
+            status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.staff)
+        body = self.client.get(reverse('metrics')).content.decode()
+        labels = 'route="tasks-list",view="TasksViewSet.list"'
+        self.assertIn(f'freelance_request_queries_count{{{labels}}} 1', body)
+        self.assertIn(f'freelance_request_serializer_seconds_sum{{{labels}}}',
+                      body)
+        self.assertIn('freelance_jobs{status="queued"} 0', body)
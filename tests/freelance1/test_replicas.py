@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from freelance1.replicas import ReplicaMiddleware, copy_database
+from freelance1.sqlite.base import DatabaseWrapper
+from tasks.models import Task
+from users.authentication import ClaimsRefreshToken
+
+User = get_user_model()
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.author = User.objects.create_user(
+            username='author', email='author@gmail.com', role='author',
+            balance=1000)
+        self.other = User.objects.create_user(
+            username='other', email='other@gmail.com', role='author')
+        self.queries = {'default': 0, 'replica': 0}
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        for alias in self.queries:
+            stack.enter_context(connections[alias].execute_wrapper(
+                self.counter(alias)))
+
+    def counter(self, alias):
+        def count(execute, sql, params, many, context):
+            self.queries[alias] += 1
+            return execute(sql, params, many, context)
+        return count
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(
+            ClaimsRefreshToken.for_user(user).access_token))
+        return client
+
+    def request(self, client, method, url, data=None):
+        self.queries.update(default=0, replica=0)
+        response = getattr(client, method)(url, data, format='json')
+        return response, dict(self.queries)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        client = self.client_for(self.other)
+        response, queries = self.request(client, 'get', reverse('tasks-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries['default'], 0)
+        self.assertGreater(queries['replica'], 0)
+
+        response, queries = self.request(
+            self.client_for(self.author), 'post', reverse('tasks-list'),
+            {'title': 'title', 'price': 100})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(queries['replica'], 0)
+
+    def test_read_your_writes(self):
+        client = self.client_for(self.author)
+        response, _ = self.request(client, 'patch',
+                                   reverse('users-balance'),
+                                   {'balance': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response, queries = self.request(client, 'get',
+                                         reverse('tasks-list'))
+        self.assertEqual(queries['replica'], 0)
+        # Чужие изменения не прилипают к другим пользователям.
+        _, queries = self.request(self.client_for(self.other), 'get',
+                                  reverse('tasks-list'))
+        self.assertEqual(queries['default'], 0)
+
+    def test_reads_outside_requests_and_in_atomic_use_primary(self):
+        self.queries.update(default=0, replica=0)
+        Task.objects.count()
+        with transaction.atomic():
+            User.objects.get(pk=self.author.pk)
+        self.assertEqual(self.queries['replica'], 0)
+
+    def test_pin_needs_shared_cache(self):
+        with self.settings(SHARED_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaMiddleware(lambda request: None)
+
+
+class CopyDatabaseTest(TestCase):
+    def test_copy(self):
+        directory = tempfile.mkdtemp()
+        wrappers = [DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory, name),
+            'OPTIONS': {'pragmas': {'journal_mode': 'WAL'}}})
+            for name in ('primary.sqlite3', 'replica.sqlite3')]
+        primary, replica = wrappers
+        try:
+            with primary.cursor() as cursor:
+                cursor.execute('CREATE TABLE t (id integer)')
+                cursor.execute('INSERT INTO t VALUES (1), (2)')
+            copy_database(primary, replica)
+            with replica.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM t')
+                self.assertEqual(cursor.fetchone()[0], 2)
+        finally:
+            for wrapper in wrappers:
+                wrapper.close()
+            shutil.rmtree(directory)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_command_needs_replicas(self):
+        with self.assertRaisesMessage(CommandError, 'No replicas'):
+            call_command('sync_replica')
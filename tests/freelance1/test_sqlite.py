@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.test import TestCase
+
+from freelance1.sqlite.base import DatabaseWrapper
+
+
+class SQLiteBackendTest(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'db.sqlite3')
+        self.wrappers = []
+
+        def cleanup():
+            for wrapper in self.wrappers:
+                wrapper.close()
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+        self.addCleanup(cleanup)
+
+    def wrapper(self, **options):
+        wrapper = DatabaseWrapper({
+            **connection.settings_dict, 'NAME': self.path,
+            'OPTIONS': options})
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_on_every_connection(self):
+        wrapper = self.wrapper(pragmas={
+            'busy_timeout': 1234, 'journal_mode': 'WAL',
+            'synchronous': 'NORMAL', 'temp_store': 'MEMORY'})
+        for _ in range(2):
+            self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+            self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+            self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+            self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+            wrapper.close()
+
+    def test_immediate_transaction_takes_write_lock(self):
+        first = self.wrapper(transaction_mode='immediate')
+        second = self.wrapper(pragmas={'busy_timeout': 0},
+                              transaction_mode='IMMEDIATE')
+        with first.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (id integer)')
+        statements = []
+
+        def log(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with first.execute_wrapper(log):
+            first.set_autocommit(
+                False, force_begin_transaction_with_broken_autocommit=True)
+        self.assertEqual(statements, ['BEGIN IMMEDIATE'])
+        # Блокировка взята до первой записи: второй писатель не начнёт.
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            second.set_autocommit(
+                False, force_begin_transaction_with_broken_autocommit=True)
+        first.rollback()
+
+    def test_unknown_transaction_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(transaction_mode='LAZY').ensure_connection()
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from jobs import queue
+from jobs.models import Job, JobStatuses
+
+WORKER = 'test-worker'
+calls = []
+
+
+@queue.handler('tests.flaky')
+def flaky(fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError('boom')
+
+
+@override_settings(JOBS_RETRY_BASE=10, JOBS_RETRY_MAX=15)
+class QueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_pending(self):
+        job = queue.enqueue('tests.flaky', fail_times=0)
+        self.assertEqual(queue.run_pending(WORKER), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatuses.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(queue.run_pending(WORKER), 0)
+
+    def test_retry_with_backoff_then_fail(self):
+        job = queue.enqueue('tests.flaky', max_attempts=3, fail_times=5)
+        before = timezone.now()
+        queue.run_pending(WORKER)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatuses.QUEUED)
+        self.assertIn('boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        self.assertEqual(queue.run_pending(WORKER), 0)
+        self.assertEqual([queue.backoff(n) for n in (1, 2, 3)], [10, 15, 15])
+        for _ in range(2):
+            Job.objects.update(run_at=timezone.now())
+            queue.run_pending(WORKER)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatuses.FAILED)
+        self.assertEqual(job.attempts, 3)
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = queue.enqueue('tests.flaky', fail_times=0)
+        self.assertEqual(queue.claim(WORKER).pk, job.pk)
+        self.assertIsNone(queue.claim('other-worker'))
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.claim('other-worker').attempts, 2)
+
+    def test_metrics(self):
+        queue.enqueue('tests.flaky', fail_times=0)
+        queue.enqueue('tests.flaky', fail_times=0, delay=60)
+        queue.run_pending(WORKER)
+        metrics = queue.metrics()
+        self.assertEqual(metrics['depth'][JobStatuses.DONE], 1)
+        self.assertEqual(metrics['depth'][JobStatuses.QUEUED], 1)
+        self.assertEqual(metrics['ready'], 0)
+        self.assertEqual(metrics['finished'], 1)
+        self.assertGreaterEqual(metrics['wait_avg'], 0)
+        out = StringIO()
+        call_command('job_stats', stdout=out)
+        self.assertIn('"finished": 1', out.getvalue())
+
+
+class ConfirmationEmailTest(APITestCase):
+    def test_email_is_sent_by_worker(self):
+        response = self.client.post(
+            reverse('emailconfirm-send-confirmation-code'),
+            {'username': 'user', 'email': 'user@gmail.com',
+             'role': 'executor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'users.send_confirmation_code')
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@gmail.com'])
@@ -0,0 +1,86 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tasks.models import Comment, Task
+from tasks.serializers import CommentSerializer, TasksSerializer
+from users.authentication import ClaimsRefreshToken
+
+User = get_user_model()
+
+AUTHOR = 'author'
+AUTHOR_EMAIL = 'author@gmail.com'
+AUTHOR_ROLE = 'author'
+TITLE = 'test_title'
+TEXT = 'test_text'
+
+
+class AsyncReadViewsTest(TransactionTestCase):
+    # Загрузка идёт в потоке пула со своим соединением, которое не видит
+    # незакоммиченных данных TestCase.
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        self.task = Task.objects.create(author=self.author, title=TITLE)
+        root = Comment.objects.create(task=self.task, text=TEXT)
+        Comment.objects.create(task=self.task, text=TEXT, parent=root)
+        token = ClaimsRefreshToken.for_user(self.author).access_token
+        self.headers = {'authorization': f'Bearer {token}'}
+        self.client = AsyncClient()
+
+    def get(self, url, headers=None):
+        headers = self.headers if headers is None else headers
+        return async_to_sync(self.client.get)(url, **headers)
+
+    def test_task_list(self):
+        response = self.get(reverse('async-tasks-list'))
+        self.assertEqual(response.status_code, 200)
+        task, = response.json()['results']
+        self.assertEqual(task['author'], AUTHOR)
+        self.assertEqual(task['comment_count'], 2)
+
+    def test_search_keeps_relevance_order(self):
+        # Релевантная задача создана раньше: порядок по -id был бы другим.
+        for title in ('logo logo logo', 'logo', 'landing'):
+            Task.objects.create(author=self.author, title=title, text=TEXT)
+        url = reverse('async-tasks-list') + '?search=logo'
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=self.headers['authorization'])
+        expected = client.get(reverse('tasks-list') + '?search=logo').json()
+        response = self.get(url).json()
+        self.assertEqual([task['id'] for task in response['results']],
+                         [task['id'] for task in expected['results']])
+        self.assertEqual(len(response['results']), 2)
+        self.assertIn('count', expected)
+
+    def test_task_detail(self):
+        response = self.get(reverse('async-tasks-detail',
+                                    args=[self.task.id]))
+        self.task.refresh_from_db()
+        self.assertEqual(response.json(),
+                         dict(TasksSerializer(self.task).data))
+        missing = self.get(reverse('async-tasks-detail',
+                                   args=[self.task.id + 1]))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_comment_list(self):
+        response = self.get(reverse('async-comments-list',
+                                    args=[self.task.id]))
+        expected = CommentSerializer(
+            Comment.objects.filter(parent=None), many=True).data
+        self.assertEqual(response.json()['results'], expected)
+
+    def test_me(self):
+        response = self.get(reverse('async-users-me'))
+        self.assertEqual(response.json()['username'], AUTHOR)
+
+    def test_requires_authentication(self):
+        response = self.get(reverse('async-tasks-list'), headers={})
+        self.assertEqual(response.status_code, 401)
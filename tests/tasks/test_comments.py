@@ -0,0 +1,169 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from tasks.models import Task, Comment
+from tasks.serializers import CommentSerializer
+
+User = get_user_model()
+
+AUTHOR = 'author'
+AUTHOR_EMAIL = 'author@gmail.com'
+AUTHOR_ROLE = 'author'
+TITLE = 'test_title'
+# Включая запрос версии задачи для ETag.
+LIST_QUERIES = 5
+
+
+def create_comment_tree(task, size):
+    """Бинарное дерево: у комментария i родитель (i - 1) // 2."""
+    comments = []
+    for number in range(size):
+        parent = comments[(number - 1) // 2] if number else None
+        comment = Comment.objects.create(task=task, text=f'comment {number}',
+                                         parent=parent)
+        comments.append(comment)
+    return comments
+
+
+def bulk_create_comment_tree(task, size):
+    root = Comment.objects.create(task=task, text='comment 0')
+    paths = [root.path]
+    comments = []
+    for number in range(1, size):
+        parent_path = paths[(number - 1) // 2]
+        paths.append(Comment.build_path(root.id + number, parent_path))
+        comments.append(Comment(id=root.id + number, task=task,
+                                text=f'comment {number}',
+                                parent_id=root.id + (number - 1) // 2,
+                                path=paths[-1],
+                                depth=paths[-1].count('/') - 1))
+    Comment.objects.bulk_create(comments, batch_size=500)
+    return root
+
+
+class CommentTreeTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.client = APIClient()
+
+    def comments_url(self, task):
+        return reverse('comments-list', args=[task.id])
+
+    def test_nested_output_matches_recursive_serializer(self):
+        task = Task.objects.create(author=self.author, title=TITLE)
+        comments = create_comment_tree(task, 10)
+        Comment.objects.create(task=task, text='second root')
+        response = self.client.get(self.comments_url(task))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = CommentSerializer(
+            Comment.objects.filter(task=task, parent=None), many=True).data
+        self.assertEqual(response.json()['results'], expected)
+        detail = self.client.get(
+            reverse('comments-detail', args=[task.id, comments[0].id]))
+        self.assertEqual(detail.json(), CommentSerializer(comments[0]).data)
+
+    def test_list_query_count_does_not_depend_on_tree_size(self):
+        for size in (10, 10000):
+            with self.subTest(size=size):
+                task = Task.objects.create(author=self.author, title=TITLE)
+                bulk_create_comment_tree(task, size)
+                with self.assertNumQueries(LIST_QUERIES):
+                    response = self.client.get(self.comments_url(task))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                root = response.json()['results'][0]
+                self.assertEqual(len(root['children']), 2)
+
+
+class CommentPathTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.client = APIClient()
+
+    def setUp(self):
+        self.task = Task.objects.create(author=self.author, title=TITLE)
+        self.comments = create_comment_tree(self.task, 7)
+
+    def test_path_and_depth_on_create(self):
+        root, child, _, grandchild = self.comments[:4]
+        grandchild.refresh_from_db()
+        self.assertEqual(root.depth, 0)
+        self.assertEqual(grandchild.depth, 2)
+        self.assertEqual(grandchild.path,
+                         Comment.build_path(grandchild.id, child.path))
+
+    def test_reparent_moves_subtree(self):
+        root, child, sibling = self.comments[:3]
+        child.parent = sibling
+        child.save()
+        grandchild = Comment.objects.get(pk=self.comments[3].id)
+        self.assertEqual(grandchild.depth, 3)
+        self.assertTrue(grandchild.path.startswith(sibling.path))
+        self.assertEqual(
+            Comment.objects.subtree(sibling.path).count(), 6)
+
+    def test_cant_move_comment_into_own_subtree(self):
+        root, child = self.comments[:2]
+        root.parent = child
+        with self.assertRaises(ValidationError):
+            root.save()
+
+    def test_delete_turns_children_into_roots(self):
+        self.comments[1].delete()
+        grandchild = Comment.objects.get(pk=self.comments[3].id)
+        self.assertIsNone(grandchild.parent_id)
+        self.assertEqual(grandchild.depth, 0)
+        self.assertEqual(grandchild.path, Comment.build_path(grandchild.id))
+
+    def test_delete_parent_and_child_together(self):
+        # Ребёнок с меньшим id, чем у родителя: post_delete Django шлёт
+        # по убыванию id, то есть сначала для родителя.
+        child, parent = self.comments[1], self.comments[6]
+        child.parent = parent
+        child.save()
+        Comment.objects.filter(pk__in=[child.id, parent.id]).delete()
+        for comment in Comment.objects.select_related('parent'):
+            parent = comment.parent
+            self.assertEqual(comment.path, Comment.build_path(
+                comment.id, parent.path if parent else ''))
+            self.assertEqual(comment.depth, parent.depth + 1 if parent else 0)
+        self.assertEqual(Comment.objects.filter(depth=0).count(), 3)
+
+    def test_subtree_endpoint(self):
+        child = self.comments[1]
+        url = reverse('comments-subtree', args=[self.task.id, child.id])
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), CommentSerializer(child).data)
+
+    def test_depth_limited_thread(self):
+        response = self.client.get(
+            reverse('comments-list', args=[self.task.id]), {'depth': 1})
+        root = response.json()['results'][0]
+        self.assertEqual(len(root['children']), 2)
+        self.assertEqual(root['children'][0]['children'], [])
+        response = self.client.get(
+            reverse('comments-list', args=[self.task.id]), {'depth': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reply_counts(self):
+        second_root = Comment.objects.create(task=self.task, text='root')
+        url = reverse('comments-reply-counts', args=[self.task.id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.json(),
+                         [{'id': self.comments[0].id, 'replies': 6},
+                          {'id': second_root.id, 'replies': 0}])
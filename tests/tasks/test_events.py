@@ -0,0 +1,125 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from tasks import events
+from tasks.events import CacheBroker, InMemoryBroker
+from tasks.models import Task
+from tasks.streaming import EVENTS_STREAM_PATH, sse_app
+from users.authentication import ClaimsRefreshToken
+
+User = get_user_model()
+
+AUTHOR = 'author'
+EXECUTOR = 'executor'
+AUTHOR_EMAIL = 'author@gmail.com'
+EXECUTOR_EMAIL = 'executor@gmail.com'
+AUTHOR_ROLE = 'author'
+EXECUTOR_ROLE = 'executor'
+TITLE = 'test_title'
+
+
+class BrokerTest(SimpleTestCase):
+    def test_in_memory_broker(self):
+        broker = InMemoryBroker(size=2)
+        for number in range(3):
+            broker.publish(events.TASK_CREATED, {'task': number})
+        self.assertEqual([event['id'] for event in broker.read(0)], [2, 3])
+        self.assertEqual(broker.wait(3, 0), [])
+
+    def test_cache_broker(self):
+        cache.clear()
+        broker = CacheBroker()
+        first = broker.publish(events.TASK_CREATED, {'task': 1})
+        broker.publish(events.TASK_DONE, {'task': 1})
+        self.assertEqual([event['type'] for event in broker.read(first['id'])],
+                         [events.TASK_DONE])
+        self.assertEqual(broker.last_id(), first['id'] + 1)
+
+
+class EventsFeedTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+        cls.task = Task.objects.create(author=cls.author, title=TITLE)
+        cls.executor_client = APIClient()
+        cls.executor_client.force_authenticate(user=cls.executor)
+
+    def setUp(self):
+        self.broker = InMemoryBroker()
+        patcher = mock.patch('tasks.events._broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_respond_is_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.executor_client.post(
+                reverse('respond-list', args=[self.task.id]),
+                data=json.dumps({'task': self.task.id}),
+                content_type='application/json')
+        response = self.executor_client.get(
+            reverse('events'), {'after': 0, 'task': self.task.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event, = response.data['events']
+        self.assertEqual(event['type'], events.RESPOND_CREATED)
+        self.assertEqual(event['data']['author'], self.executor.id)
+        self.assertEqual(response.data['last_id'], event['id'])
+
+    def test_long_poll_times_out_empty(self):
+        self.broker.publish(events.TASK_DONE, {'task': self.task.id + 1})
+        response = self.executor_client.get(
+            reverse('events'),
+            {'after': 0, 'timeout': 0, 'task': self.task.id})
+        self.assertEqual(response.data, {'events': [], 'last_id': 1})
+
+    def test_sse_stream(self):
+        token = ClaimsRefreshToken.for_user(self.executor).access_token
+        scope = {'type': 'http', 'path': EVENTS_STREAM_PATH,
+                 'query_string': f'token={token}'.encode(),
+                 'headers': [(b'last-event-id', b'0')]}
+        self.broker.publish(events.TASK_CREATED, {'task': self.task.id})
+        messages = []
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message.get('more_body'):
+                disconnect.set()
+
+        async_to_sync(sse_app)(scope, receive, send)
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertEqual(
+            messages[1]['body'],
+            b'id: 1\nevent: task_created\n'
+            + f'data: {{"task": {self.task.id}}}\n\n'.encode())
+
+    def test_sse_requires_token(self):
+        scope = {'type': 'http', 'path': EVENTS_STREAM_PATH,
+                 'query_string': b'', 'headers': []}
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(sse_app)(scope, None, send)
+        self.assertEqual(messages[0]['status'], 401)
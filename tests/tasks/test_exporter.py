@@ -0,0 +1,87 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from tasks.models import Task, TaskStatuses, Transaction
+
+User = get_user_model()
+
+
+class ExportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@gmail.com', role='author')
+        cls.executor = User.objects.create_user(
+            username='executor', email='executor@gmail.com',
+            role='executor')
+        cls.other = User.objects.create_user(
+            username='other', email='other@gmail.com', role='author')
+        cls.task = Task.objects.create(author=cls.author, title='done',
+                                       executor=cls.executor,
+                                       status=TaskStatuses.DONE)
+        Task.objects.create(author=cls.other, title='active')
+        Transaction.objects.create(task=cls.task, author=cls.author,
+                                   executor=cls.executor, price=500,
+                                   status=Transaction.SUCCESS)
+        Transaction.objects.create(author=cls.other, price=100,
+                                   status=Transaction.FAIL)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.executor)
+
+    def export(self, kind, fmt, **params):
+        response = self.client.get(
+            reverse('export', kwargs={'kind': kind, 'fmt': fmt}), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_transactions_csv_are_limited_to_own(self):
+        rows = list(csv.DictReader(io.StringIO(
+            self.export('transactions', 'csv'))))
+        self.assertEqual([row['executor__username'] for row in rows],
+                         ['executor'])
+        self.assertEqual(rows[0]['price'], '500')
+
+    def test_tasks_jsonl_filters(self):
+        lines = self.export('tasks', 'jsonl', status=TaskStatuses.ACTIVE,
+                            user=self.other.id).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines],
+                         ['active'])
+        self.assertEqual(self.export('tasks', 'jsonl', since='2999-01-01'),
+                         '')
+
+    def test_gzip_on_the_fly(self):
+        self.client.force_authenticate(
+            user=User.objects.create_user(username='staff', is_staff=True,
+                                          email='staff@gmail.com'))
+        response = self.client.get(
+            reverse('export', kwargs={'kind': 'transactions', 'fmt': 'csv'}),
+            HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(body.decode().splitlines()), 3)
+
+    def test_invalid_filter(self):
+        response = self.client.get(
+            reverse('export', kwargs={'kind': 'tasks', 'fmt': 'csv'}),
+            {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tasks.jsonl.gz')
+            call_command('export_data', 'tasks', path, format='jsonl',
+                         gzip=True, stderr=io.StringIO())
+            with gzip.open(path, 'rt') as stream:
+                self.assertEqual(len(stream.read().splitlines()), 2)
@@ -0,0 +1,60 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from tasks.generator import Generator
+from tasks.models import (Comment, LedgerEntry, Respond, Task, TaskStatuses,
+                          Transaction)
+from tasks.search import search_tasks
+
+User = get_user_model()
+
+
+class GeneratorTest(TestCase):
+    def generate(self, seed=0):
+        return Generator(seed=seed, chunk_size=50).run(
+            users=30, tasks=200, responds=2, comments=3)
+
+    def test_counts_match_rows(self):
+        counts = self.generate()
+        self.assertEqual(counts['tasks'], Task.objects.count())
+        self.assertEqual(counts['responds'], Respond.objects.count())
+        self.assertEqual(counts['comments'], Comment.objects.count())
+        self.assertEqual(
+            Transaction.objects.count(),
+            Task.objects.filter(status=TaskStatuses.DONE).count())
+        for task in Task.objects.filter(comment_count__gt=0)[:20]:
+            self.assertEqual(task.responds.count(), task.respond_count)
+            self.assertEqual(task.comments.count(), task.comment_count)
+        self.assertFalse(Task.objects.filter(
+            status=TaskStatuses.DONE, executor=None).exists())
+
+    def test_comment_paths_follow_parents(self):
+        self.generate()
+        for comment in Comment.objects.exclude(parent=None)[:50]:
+            parent = comment.parent
+            self.assertEqual(comment.path,
+                             Comment.build_path(comment.pk, parent.path))
+            self.assertEqual(comment.depth, parent.depth + 1)
+
+    def test_deterministic(self):
+        self.generate(seed=7)
+        first = list(Task.objects.order_by('id').values_list(
+            'price', 'status', 'title'))
+        LedgerEntry.objects.all().delete()
+        Task.objects.all().delete()
+        User.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(list(Task.objects.order_by('id').values_list(
+            'price', 'status', 'title')), first)
+
+    def test_search_index_and_ledger(self):
+        self.generate()
+        title = Task.objects.values_list('title', flat=True).first()
+        self.assertTrue(search_tasks(Task.objects.all(),
+                                     title.split()[0]).exists())
+        out = StringIO()
+        call_command('verify_ledger', stdout=out)
+        self.assertIn('reconcile', out.getvalue())
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from tasks.helpers import (TransactionCreation, log_transactions,
+                           transaction_batch)
+from tasks.models import Task, Transaction
+
+User = get_user_model()
+
+AUTHOR = 'author'
+AUTHOR_EMAIL = 'author@gmail.com'
+AUTHOR_ROLE = 'author'
+TITLE = 'test_title'
+
+
+class TransactionBatchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.task = Task.objects.create(author=cls.author, title=TITLE)
+
+    def test_batch_is_written_with_one_insert(self):
+        log = TransactionCreation(self.task)
+        with self.assertNumQueries(3):
+            with transaction_batch():
+                for _ in range(5):
+                    log.create_transaction_success()
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_rolled_back_batch_is_dropped(self):
+        log = TransactionCreation(self.task)
+        with self.assertRaises(ValueError):
+            with transaction_batch():
+                log.create_transaction_success()
+                raise ValueError
+        log.create_transaction_fail()
+        self.assertEqual(
+            list(Transaction.objects.values_list('status', flat=True)),
+            [Transaction.FAIL])
+
+    def test_nested_rollback_keeps_outer_entries(self):
+        log = TransactionCreation(self.task)
+        with transaction_batch():
+            log.create_transaction_success()
+            with self.assertRaises(ValueError):
+                with transaction_batch():
+                    log.create_transaction_fail()
+                    raise ValueError
+        self.assertEqual(
+            list(Transaction.objects.values_list('status', flat=True)),
+            [Transaction.SUCCESS])
+
+    def test_bulk_logging(self):
+        tasks = Task.objects.bulk_create(
+            Task(id=self.task.id + number, author=self.author, title=TITLE)
+            for number in range(1, 4))
+        with self.assertNumQueries(1):
+            log_transactions(*(TransactionCreation(task).build(
+                Transaction.SUCCESS) for task in tasks))
+        self.assertEqual(Transaction.objects.count(), 3)
@@ -0,0 +1,85 @@
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import TestCase
+
+from tasks.importer import TaskImporter, UserImporter, read_rows
+from tasks.models import LedgerEntry, Task, Transaction
+
+User = get_user_model()
+
+USERS_CSV = b'''username,email,role,balance
+author,author@gmail.com,author,1000
+executor,EXECUTOR@GMAIL.COM,executor,0
+author,other@gmail.com,author,0
+broken,not-an-email,author,0
+'''
+
+
+class ImporterTest(TestCase):
+    def setUp(self):
+        self.errors = []
+
+    def on_error(self, line, errors):
+        self.errors.append(line)
+
+    def import_users(self):
+        return UserImporter(self.on_error, batch_size=2).run(
+            read_rows(io.BytesIO(USERS_CSV), 'csv'))
+
+    def test_import_users(self):
+        self.assertEqual(self.import_users(), (2, 2))
+        self.assertEqual(sorted(self.errors), [4, 5])
+        author = User.objects.get(username='author')
+        self.assertEqual(author.balance, 1000)
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(LedgerEntry.objects.get(user=author).amount, 1000)
+
+    def test_rolled_back_batch_reports_each_line_once(self):
+        self.import_users()
+        self.errors.clear()
+        rows = (b'username,email,role,balance\n'
+                b'author,author2@gmail.com,author,0\n'
+                b'fresh,fresh@gmail.com,author,0\n')
+        with mock.patch('tasks.importer.insert_with_ids',
+                        side_effect=IntegrityError('conflict')):
+            result = UserImporter(self.on_error).run(
+                read_rows(io.BytesIO(rows), 'csv'))
+        self.assertEqual(result, (0, 2))
+        self.assertEqual(sorted(self.errors), [2, 3])
+
+    def test_import_tasks_freezes_price(self):
+        self.import_users()
+        self.errors.clear()
+        rows = [{'author': 'author', 'title': 'one', 'price': 600},
+                {'author': 'author', 'title': 'two', 'price': 600},
+                {'author': 'executor', 'title': 'three'},
+                {'author': 'author', 'title': 'four', 'price': 400}]
+        stream = io.BytesIO(
+            b'\n'.join(json.dumps(row).encode() for row in rows) + b'\n{')
+        with self.assertNumQueries(9):
+            result = TaskImporter(self.on_error).run(
+                read_rows(stream, 'jsonl'))
+        self.assertEqual(result, (2, 3))
+        self.assertEqual(sorted(self.errors), [2, 3, 5])
+        author = User.objects.get(username='author')
+        self.assertEqual((author.balance, author.freeze_balance), (0, 1000))
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(
+            set(Task.objects.values_list('title', flat=True)), {'one', 'four'})
+
+    def test_admin_upload(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@gmail.com', password='admin',
+            is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.post(
+            '/admin/users/user/import/',
+            {'file': SimpleUploadedFile('users.csv', USERS_CSV)},
+            follow=True)
+        self.assertContains(response, 'Imported 2, failed 2')
+        self.assertTrue(User.objects.filter(username='executor').exists())
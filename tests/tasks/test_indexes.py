@@ -0,0 +1,71 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from tasks.models import Task, Respond, Transaction
+
+User = get_user_model()
+
+AUTHOR = 'author'
+AUTHOR_EMAIL = 'author@gmail.com'
+AUTHOR_ROLE = 'author'
+TITLE = 'test_title'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.task = Task.objects.create(author=cls.author, title=TITLE)
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, usage):
+        plan = self.query_plan(queryset)
+        self.assertTrue(any(usage in step for step in plan), plan)
+        for step in plan:
+            self.assertFalse(step.startswith('SCAN') and 'INDEX' not in step,
+                             plan)
+            self.assertNotIn('TEMP B-TREE', step, plan)
+
+    def test_active_tasks_by_price(self):
+        self.assertUsesIndex(
+            Task.objects.filter(status='active').order_by('price'),
+            'task_status_price_idx')
+
+    def test_feed_by_status(self):
+        self.assertUsesIndex(
+            Task.objects.filter(status='active', id__lt=100),
+            'task_status_id_idx')
+
+    def test_executor_in_progress_tasks(self):
+        self.assertUsesIndex(
+            Task.objects.filter(executor=self.author, status='in_progress'),
+            'task_executor_status_idx')
+
+    def test_author_tasks_by_status(self):
+        self.assertUsesIndex(
+            Task.objects.filter(author=self.author, status='done'),
+            'task_author_status_idx')
+
+    def test_user_transactions_by_date(self):
+        self.assertUsesIndex(
+            Transaction.objects.filter(author=self.author)
+            .order_by('-created'),
+            'transaction_author_idx')
+
+    def test_respond_by_task_and_author(self):
+        self.assertUsesIndex(
+            Respond.objects.filter(task=self.task, author=self.author),
+            '(task_id=? AND author_id=?)')
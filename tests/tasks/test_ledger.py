@@ -0,0 +1,179 @@
+import threading
+import time
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.db.models import ProtectedError, Sum
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from tasks import ledger
+from tasks.exceptions import BalanceTransferError
+from tasks.models import BalanceSnapshot, LedgerEntry
+
+User = get_user_model()
+
+AUTHOR = 'author'
+EXECUTOR = 'executor'
+AUTHOR_EMAIL = 'author@gmail.com'
+EXECUTOR_EMAIL = 'executor@gmail.com'
+AUTHOR_ROLE = 'author'
+EXECUTOR_ROLE = 'executor'
+START_BALANCE = 1000
+PRICE = 10
+THREADS = 8
+ATTEMPTS = 25
+
+
+class LedgerTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            balance=START_BALANCE,
+            role=AUTHOR_ROLE)
+        self.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+
+    def test_freeze_release_payout(self):
+        ledger.freeze(self.author.id, 300)
+        ledger.release(self.author.id, 100)
+        ledger.payout(self.author.id, self.executor.id, 150)
+        self.author.refresh_from_db()
+        self.executor.refresh_from_db()
+        self.assertEqual(self.author.balance, 800)
+        self.assertEqual(self.author.freeze_balance, 50)
+        self.assertEqual(self.executor.balance, 150)
+
+    def test_guards(self):
+        with self.assertRaises(BalanceTransferError):
+            ledger.freeze(self.author.id, START_BALANCE + 1)
+        with self.assertRaises(BalanceTransferError):
+            ledger.release(self.author.id, 1)
+        with self.assertRaises(BalanceTransferError):
+            ledger.payout(self.author.id, self.executor.id, 1)
+        self.executor.refresh_from_db()
+        self.assertEqual(self.executor.balance, 0)
+
+
+class LedgerJournalTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        self.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+        ledger.deposit(self.author.id, START_BALANCE)
+        ledger.freeze(self.author.id, 300)
+        ledger.payout(self.author.id, self.executor.id, 200)
+
+    def test_every_operation_is_double_entry(self):
+        self.assertEqual(LedgerEntry.objects.count(), 6)
+        self.assertEqual(
+            LedgerEntry.objects.aggregate(total=Sum('amount'))['total'], 0)
+
+    def test_balance_of_matches_user_fields(self):
+        self.assertEqual(ledger.balance_of(self.author.id), (700, 100))
+        self.assertEqual(ledger.balance_of(self.executor.id), (200, 0))
+
+    def test_balance_uses_latest_snapshot_plus_delta(self):
+        call_command('snapshot_balances', stdout=StringIO())
+        self.assertEqual(BalanceSnapshot.objects.count(), 2)
+        LedgerEntry.objects.filter(
+            id__lte=BalanceSnapshot.objects.first().last_entry_id).delete()
+        ledger.release(self.author.id, 100)
+        self.assertEqual(ledger.balance_of(self.author.id), (800, 0))
+
+    def test_historical_balance(self):
+        moment = timezone.now()
+        ledger.release(self.author.id, 100)
+        self.assertEqual(ledger.balance_of(self.author.id, at=moment),
+                         (700, 100))
+
+    def test_verify_ledger(self):
+        out = StringIO()
+        call_command('verify_ledger', stdout=out)
+        self.assertIn('2 users reconcile', out.getvalue())
+        User.objects.filter(pk=self.executor.id).update(balance=1)
+        with self.assertRaises(CommandError):
+            call_command('verify_ledger', stdout=StringIO())
+
+    def test_users_with_entries_are_not_deleted(self):
+        with self.assertRaises(ProtectedError):
+            self.executor.delete()
+        self.assertEqual(
+            LedgerEntry.objects.aggregate(total=Sum('amount'))['total'], 0)
+
+    def test_unbalanced_postings(self):
+        with self.assertRaises(ValueError):
+            ledger.build_entries((self.author.id, 'balance', 1))
+
+
+class LedgerConcurrencyTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            balance=START_BALANCE,
+            role=AUTHOR_ROLE)
+        self.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+
+    def run_concurrently(self, operation):
+        results = []
+
+        def worker():
+            try:
+                for _ in range(ATTEMPTS):
+                    while True:
+                        try:
+                            operation()
+                            results.append(True)
+                        except BalanceTransferError:
+                            results.append(False)
+                        except OperationalError:
+                            # SQLite пускает одного писателя за раз.
+                            time.sleep(0.001)
+                            continue
+                        break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_parallel_freezes_never_overdraw(self):
+        results = self.run_concurrently(
+            lambda: ledger.freeze(self.author.id, PRICE))
+        self.author.refresh_from_db()
+        self.assertEqual(results.count(True), START_BALANCE // PRICE)
+        self.assertEqual(self.author.balance, 0)
+        self.assertEqual(self.author.freeze_balance, START_BALANCE)
+
+    def test_parallel_payouts_keep_total(self):
+        ledger.freeze(self.author.id, START_BALANCE // 2)
+        results = self.run_concurrently(
+            lambda: ledger.payout(self.author.id, self.executor.id, PRICE))
+        self.author.refresh_from_db()
+        self.executor.refresh_from_db()
+        paid = results.count(True) * PRICE
+        self.assertEqual(paid, START_BALANCE // 2)
+        self.assertEqual(self.executor.balance, paid)
+        self.assertEqual(self.author.freeze_balance, 0)
+        self.assertEqual(self.author.balance + self.author.freeze_balance +
+                         self.executor.balance, START_BALANCE)
@@ -1,5 +1,10 @@
 import json
+from io import StringIO
+from unittest import mock
 
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
@@ -7,8 +12,10 @@ from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from tasks.models import Task, Respond, Transaction
+from tasks.helpers import TransactionCreation
+from tasks.models import Task, Respond, Transaction, Comment
 from tasks.serializers import TasksSerializer, RespondsSerializer
+from users.authentication import ClaimsRefreshToken
 
 User = get_user_model()
 
@@ -115,6 +122,27 @@ class TaskModelTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(tasks_before, tasks_after + 1)
 
+    def test_delete_task_releases_frozen_money(self):
+        self.auth_client.delete(self.TASK_DETAIL_URL)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.balance, START_BALANCE + TASK_PRICE)
+        self.assertEqual(self.author.freeze_balance,
+                         START_BALANCE - TASK_PRICE)
+
+    def test_price_change_refreezes_difference(self):
+        response = self.auth_client.patch(
+            self.TASK_DETAIL_URL,
+            data=json.dumps({'price': TASK_PRICE + 100}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.balance, START_BALANCE - 100)
+        response = self.auth_client.patch(
+            self.TASK_DETAIL_URL,
+            data=json.dumps({'price': START_BALANCE * 2}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_executor_cant_delete_task(self):
         tasks_before = Task.objects.count()
         response = self.executor_client.delete(self.TASK_DETAIL_URL)
@@ -260,10 +288,16 @@ class RespondTest(APITestCase):
         self.assertEqual(serializer_data, response.data)
 
     def test_executor_create_respond(self):
+        executor2 = User.objects.create_user(
+            username='executor2',
+            email='executor2@gmail.com',
+            role=EXECUTOR_ROLE)
+        self.executor_client.force_authenticate(user=executor2)
         response = self.executor_client.post(
             self.RESPONDS_LIST_URL,
             data=json.dumps(RESPOND_NEW_DATA),
             content_type='application/json')
+        self.executor_client.force_authenticate(user=self.executor)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Respond.objects.count(), 2)
         respond = Respond.objects.exclude(id=self.respond1.id)[0]
@@ -271,6 +305,25 @@ class RespondTest(APITestCase):
         self.assertEqual(respond.author.id, response.json()['author'])
         self.assertEqual(respond.task.id, response.json()['task'])
 
+    def test_executor_cant_respond_twice(self):
+        response = self.executor_client.post(
+            self.RESPONDS_LIST_URL,
+            data=json.dumps(RESPOND_NEW_DATA),
+            content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Respond.objects.count(), 1)
+
+    def test_concurrent_duplicate_respond(self):
+        # Дубль, прошедший проверку до записи первого отклика.
+        with mock.patch('django.db.models.QuerySet.exists',
+                        return_value=False):
+            response = self.executor_client.post(
+                self.RESPONDS_LIST_URL,
+                data=json.dumps(RESPOND_NEW_DATA),
+                content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Respond.objects.count(), 1)
+
     def test_author_cant_create_respond(self):
         response = self.auth_client.post(
             self.RESPONDS_LIST_URL,
@@ -301,6 +354,28 @@ class RespondTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()['executor'], self.respond1.author.id)
 
+    def test_concurrent_winner_is_chosen_once(self):
+        other = User.objects.create_user(
+            username='executor2', email='executor2@gmail.com',
+            role=EXECUTOR_ROLE)
+        creation = TransactionCreation
+
+        def choose_other(task):
+            # Другой запрос назначает исполнителя после проверки прав.
+            Task.objects.filter(pk=task.pk).update(executor=other)
+            return creation(task)
+
+        with mock.patch('tasks.views.TransactionCreation', choose_other), \
+                mock.patch('tasks.views.events.publish') as publish:
+            response = self.auth_client.patch(
+                self.RESPOND_WINNER, data={},
+                content_type='application/json')
+        self.assertEqual(response.data,
+                         f'Executor is already chosen: {other}')
+        publish.assert_not_called()
+        self.task1.refresh_from_db()
+        self.assertEqual(self.task1.executor, other)
+
     def test_executor_cant_choose_winner(self):
         response = self.executor_client.patch(
             self.RESPOND_WINNER,
@@ -308,6 +383,27 @@ class RespondTest(APITestCase):
             content_type='application/json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_other_author_cant_choose_winner(self):
+        other = User.objects.create_user(
+            username='author2', email='author2@gmail.com', role=AUTHOR_ROLE)
+        client = APIClient()
+        client.force_authenticate(user=other)
+        response = client.patch(self.RESPOND_WINNER, data={},
+                                content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.task1.refresh_from_db()
+        self.assertIsNone(self.task1.executor)
+
+    def test_respond_of_other_task_cant_win(self):
+        task2 = Task.objects.create(author=self.author, title=TITLE,
+                                    text=TEXT, status='active')
+        response = self.auth_client.patch(
+            reverse('respond-winner', args=[task2.id, self.respond1.id]),
+            data={}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        task2.refresh_from_db()
+        self.assertIsNone(task2.executor)
+
 
 class TransactionsTest(APITestCase):
     @classmethod
@@ -390,3 +486,374 @@ class TransactionsTest(APITestCase):
         self.assertEqual(transaction.author, task2.author)
         self.assertEqual(transaction.executor, task2.executor)
         self.assertEqual(transaction.status, 'Fail')
+
+
+class TaskCountersTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+        cls.task = Task.objects.create(
+            author=cls.author,
+            title=TITLE,
+            text=TEXT)
+        cls.executor_client = APIClient()
+        cls.executor_client.force_authenticate(user=cls.executor)
+
+    def assertCounters(self, responds, comments):
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.respond_count, responds)
+        self.assertEqual(self.task.comment_count, comments)
+
+    def test_counters_follow_creates_and_deletes(self):
+        response = self.executor_client.post(
+            reverse('respond-list', args=[self.task.id]),
+            data=json.dumps({'task': self.task.id}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        root = Comment.objects.create(task=self.task, text=TEXT)
+        Comment.objects.create(task=self.task, text=TEXT, parent=root)
+        self.assertCounters(1, 2)
+        root.delete()
+        Respond.objects.get().delete()
+        self.assertCounters(0, 1)
+
+    def test_update_keeps_counters(self):
+        task = Task.objects.get(pk=self.task.pk)
+        Respond.objects.create(task=self.task, author=self.executor)
+        serializer = TasksSerializer(task, data={'title': 'new'},
+                                     partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertCounters(1, 0)
+
+    def test_recount_fixes_drift(self):
+        Comment.objects.create(task=self.task, text=TEXT)
+        Task.objects.update(respond_count=5, comment_count=0)
+        out = StringIO()
+        call_command('recount_task_counters', stdout=out)
+        self.assertIn('1 tasks recounted', out.getvalue())
+        self.assertCounters(0, 1)
+
+
+class TaskListQueriesTest(APITestCase):
+    # Версия для ETag, страница задач, комментарии.
+    LIST_QUERIES = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+        cls.auth_client = APIClient()
+        cls.auth_client.force_authenticate(user=cls.author)
+
+    def create_tasks(self, count):
+        for number in range(count):
+            task = Task.objects.create(
+                author=self.author,
+                executor=self.executor,
+                title=TITLE,
+                price=TASK_PRICE)
+            root = Comment.objects.create(task=task, text=TEXT)
+            child = Comment.objects.create(task=task, text=TEXT, parent=root)
+            Comment.objects.create(task=task, text=TEXT, parent=child)
+            Respond.objects.create(author=self.executor, task=task)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        for count in (1, 5, 10):
+            with self.subTest(count=count):
+                Task.objects.all().delete()
+                self.create_tasks(count)
+                with self.assertNumQueries(self.LIST_QUERIES):
+                    response = self.auth_client.get(TASKS_LIST_URL,
+                                                    {'expand': 'comments'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                results = response.json()['results']
+                self.assertEqual(len(results), count)
+                self.assertEqual(results[0]['author'], AUTHOR)
+                self.assertEqual(len(results[0]['comments']), 3)
+                self.assertEqual(
+                    len(results[0]['comments'][0]['children'][0]['children']),
+                    1)
+
+    def test_compact_list(self):
+        self.create_tasks(3)
+        with self.assertNumQueries(2):
+            response = self.auth_client.get(TASKS_LIST_URL)
+        task = response.json()['results'][0]
+        self.assertEqual(task, {'id': task['id'],
+                                'title': TITLE,
+                                'price': str(TASK_PRICE),
+                                'status': 'active',
+                                'author': AUTHOR,
+                                'comment_count': 3,
+                                'respond_count': 1})
+
+    def test_claims_token_needs_no_user_query(self):
+        self.create_tasks(3)
+        token = ClaimsRefreshToken.for_user(self.author).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertNumQueries(2):
+            response = client.get(TASKS_LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_uses_stable_cursor(self):
+        self.create_tasks(12)
+        response = self.auth_client.get(TASKS_LIST_URL)
+        self.assertNotIn('count', response.json())
+        first_page = [task['id'] for task in response.json()['results']]
+        self.create_tasks(3)
+        response = self.auth_client.get(response.json()['next'])
+        second_page = [task['id'] for task in response.json()['results']]
+        self.assertEqual(len(second_page), 2)
+        self.assertLess(max(second_page), min(first_page))
+
+    def test_compact_list_fields_param(self):
+        self.create_tasks(1)
+        response = self.auth_client.get(TASKS_LIST_URL,
+                                        {'fields': 'id,title'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'title'})
+
+    def test_detail_matches_serializer(self):
+        self.create_tasks(1)
+        task = Task.objects.get()
+        response = self.auth_client.get(reverse('tasks-detail',
+                                                args=[task.id]))
+        self.assertEqual(response.json(), TasksSerializer(task).data)
+
+
+class ConditionalGetTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.task = Task.objects.create(author=cls.author, title=TITLE)
+        cls.auth_client = APIClient()
+        cls.auth_client.force_authenticate(user=cls.author)
+        cls.TASK_DETAIL_URL = reverse('tasks-detail', args=[cls.task.id])
+        cls.COMMENTS_URL = reverse('comments-list', args=[cls.task.id])
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(1):
+            response = self.auth_client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_task_detail_etag(self):
+        response = self.auth_client.get(self.TASK_DETAIL_URL)
+        etag = response['ETag']
+        self.assertNotModified(self.TASK_DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotModified(
+            self.TASK_DETAIL_URL,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        Comment.objects.create(task=self.task, text=TEXT)
+        response = self.auth_client.get(self.TASK_DETAIL_URL,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_comment_list_etag(self):
+        comment = Comment.objects.create(task=self.task, text=TEXT)
+        etag = self.auth_client.get(self.COMMENTS_URL)['ETag']
+        self.assertNotModified(self.COMMENTS_URL, HTTP_IF_NONE_MATCH=etag)
+        comment.text = 'edited'
+        comment.save()
+        response = self.auth_client.get(self.COMMENTS_URL,
+                                        HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_task_list_etag(self):
+        other = Task.objects.create(author=self.author, title=TITLE)
+        etag = self.auth_client.get(TASKS_LIST_URL)['ETag']
+        self.assertNotModified(TASKS_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        other.delete()
+        response = self.auth_client.get(TASKS_LIST_URL,
+                                        HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_task_list_etag_follows_page(self):
+        etag = self.auth_client.get(TASKS_LIST_URL)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertNotModified(TASKS_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        sql = queries[0]['sql'].upper()
+        self.assertIn('LIMIT', sql)
+        self.assertNotIn('COUNT(', sql)
+        self.task.title = 'edited'
+        self.task.save()
+        response = self.auth_client.get(TASKS_LIST_URL,
+                                        HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TransactionListTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+        task = Task.objects.create(author=cls.author, title=TITLE)
+        Transaction.objects.create(task=task, author=cls.author,
+                                   price=TASK_PRICE, status='Success')
+        cls.executor_client = APIClient()
+        cls.executor_client.force_authenticate(user=cls.executor)
+        cls.auth_client = APIClient()
+        cls.auth_client.force_authenticate(user=cls.author)
+
+    def test_user_sees_own_transactions(self):
+        response = self.auth_client.get(reverse('transactions-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.executor_client.get(reverse('transactions-list'))
+        self.assertEqual(response.json()['results'], [])
+
+
+class TaskSearchTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            role=AUTHOR_ROLE)
+        cls.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+        cls.logo = Task.objects.create(
+            author=cls.author, title='Logo design', price=100,
+            text='Vector logo for a coffee shop')
+        cls.site = Task.objects.create(
+            author=cls.author, title='Landing page', price=900,
+            text='Need a logo on the landing', executor=cls.executor,
+            status='in_progress')
+        cls.auth_client = APIClient()
+        cls.auth_client.force_authenticate(user=cls.author)
+
+    def result_ids(self, params):
+        response = self.auth_client.get(TASKS_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task['id'] for task in response.json()['results']]
+
+    def test_filters(self):
+        cases = (
+            ({'status': 'in_progress'}, [self.site.id]),
+            ({'price_min': 500}, [self.site.id]),
+            ({'price_max': 500}, [self.logo.id]),
+            ({'author': AUTHOR}, [self.site.id, self.logo.id]),
+            ({'executor': self.executor.id}, [self.site.id]),
+        )
+        for params, expected in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.result_ids(params), expected)
+
+    def test_full_text_search_is_ranked(self):
+        self.assertEqual(self.result_ids({'search': 'logo'}),
+                         [self.logo.id, self.site.id])
+        self.assertEqual(self.result_ids({'search': 'coff'}),
+                         [self.logo.id])
+        self.assertEqual(self.result_ids({'search': 'logo',
+                                          'status': 'active'}),
+                         [self.logo.id])
+        self.assertEqual(self.result_ids({'search': '"*'}), [])
+
+    def test_search_index_follows_updates(self):
+        Task.objects.filter(pk=self.logo.pk).update(title='Banner',
+                                                    text='Banner')
+        self.assertEqual(self.result_ids({'search': 'logo'}), [self.site.id])
+        self.site.delete()
+        self.assertEqual(self.result_ids({'search': 'logo'}), [])
+
+
+class SettlementTest(APITestCase):
+    SETTLE_URL = reverse('tasks-settle')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR,
+            email=AUTHOR_EMAIL,
+            freeze_balance=START_BALANCE,
+            role=AUTHOR_ROLE)
+        cls.executor = User.objects.create_user(
+            username=EXECUTOR,
+            email=EXECUTOR_EMAIL,
+            role=EXECUTOR_ROLE)
+        cls.auth_client = APIClient()
+        cls.auth_client.force_authenticate(user=cls.author)
+
+    def create_task(self, **kwargs):
+        data = {'author': self.author, 'executor': self.executor,
+                'title': TITLE, 'price': 100}
+        data.update(kwargs)
+        return Task.objects.create(**data)
+
+    def settle(self, tasks):
+        return self.auth_client.post(
+            self.SETTLE_URL,
+            data=json.dumps({'tasks': tasks}),
+            content_type='application/json')
+
+    def test_bulk_settlement_with_per_task_errors(self):
+        paid = [self.create_task() for _ in range(3)]
+        done = self.create_task(status='done')
+        no_executor = self.create_task(executor=None)
+        too_expensive = self.create_task(price=START_BALANCE)
+        response = self.settle([task.id for task in paid] +
+                               [done.id, no_executor.id, too_expensive.id,
+                                999])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['settled'],
+                         [task.id for task in paid])
+        self.assertEqual(set(response.json()['errors']),
+                         {str(done.id), str(no_executor.id),
+                          str(too_expensive.id), '999'})
+        self.author.refresh_from_db()
+        self.executor.refresh_from_db()
+        self.assertEqual(self.author.freeze_balance, START_BALANCE - 300)
+        self.assertEqual(self.executor.balance, 300)
+        self.assertEqual(
+            Task.objects.filter(status='done').count(), 4)
+        self.assertEqual(
+            Transaction.objects.filter(status='Success').count(), 3)
+        self.assertEqual(
+            Transaction.objects.filter(status='Fail').count(), 2)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        for size in (2, 20):
+            with self.subTest(size=size):
+                tasks = [self.create_task(price=1) for _ in range(size)]
+                with self.assertNumQueries(11):
+                    response = self.settle([task.id for task in tasks])
+                self.assertEqual(len(response.json()['settled']), size)
+
+    def test_executor_cant_settle(self):
+        client = APIClient()
+        client.force_authenticate(user=self.executor)
+        response = client.post(self.SETTLE_URL,
+                               data=json.dumps({'tasks': [1]}),
+                               content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
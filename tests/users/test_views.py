@@ -1,11 +1,17 @@
 import json
 
+from django.core.cache import caches
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from tasks import ledger
+from tasks.models import LedgerEntry, Task
+from users.authentication import ClaimsRefreshToken
+from users.checks import check_claims_cache, check_me_cache
+
 User = get_user_model()
 
 AUTHOR = 'author'
@@ -24,6 +30,7 @@ RESPOND_NEW_DATA = {'author': 2, 'task': 1}
 
 class TaskModelTest(APITestCase):
     def setUp(self):
+        caches['shared'].clear()
         self.admin = User.objects.create_superuser(
             username='admin',
             email='admin@gmail.com',
@@ -78,6 +85,14 @@ class TaskModelTest(APITestCase):
         self.assertEqual(balance_before, START_BALANCE)
         self.assertEqual(balance_after, NEW_BALANCE)
 
+    def test_admin_created_balance_is_ledgered(self):
+        response = self.admin_client.post(USERS_LIST_URL, data={
+            'username': 'new', 'email': 'new@gmail.com', 'role': 'author',
+            'balance': START_BALANCE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ledger.balance_of(response.data['id']),
+                         (START_BALANCE, 0))
+
     def test_balance_url_add_money_to_balance(self):
         balance_before = self.author.balance
         response = self.auth_client.patch(
@@ -88,6 +103,8 @@ class TaskModelTest(APITestCase):
         balance_after = self.author.balance
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(balance_before, balance_after-NEW_BALANCE)
+        self.assertEqual(
+            LedgerEntry.objects.get(user=self.author).amount, NEW_BALANCE)
 
     def test_not_admin_cant_update_user_data(self):
         email_before = self.author.email
@@ -111,3 +128,87 @@ class TaskModelTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(email_before, AUTHOR_EMAIL)
         self.assertEqual(email_after, NEW_AUTHOR_EMAIL)
+
+    def test_me_is_cached(self):
+        Task.objects.create(author=self.executor, executor=self.executor,
+                            title='task')
+        response = self.executor_client.get(self.USER_CHANGE_DATA_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['open_tasks'],
+                         {'author': 1, 'executor': 1})
+        with self.assertNumQueries(0):
+            cached = self.executor_client.get(self.USER_CHANGE_DATA_URL)
+        self.assertEqual(cached.data, response.data)
+
+    def test_balance_invalidates_me(self):
+        self.executor_client.get(self.USER_CHANGE_DATA_URL)
+        self.executor_client.patch(
+            self.AUTHOR_ADD_BALANCE_URL,
+            data=json.dumps({'balance': NEW_BALANCE}),
+            content_type='application/json')
+        response = self.executor_client.get(self.USER_CHANGE_DATA_URL)
+        self.assertEqual(response.data['balance'],
+                         str(START_BALANCE + NEW_BALANCE))
+
+    def test_claims_token_revoked_on_deactivation(self):
+        token = ClaimsRefreshToken.for_user(self.author).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.get(self.USER_CHANGE_DATA_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        author = User.objects.get(pk=self.author.pk)
+        author.is_active = False
+        author.save()
+        response = client.get(self.USER_CHANGE_DATA_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def claims_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(
+            ClaimsRefreshToken.for_user(user).access_token))
+        return client
+
+    def test_claims_token_revoked_on_queryset_update(self):
+        client = self.claims_client(self.author)
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+        response = client.get(self.USER_CHANGE_DATA_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_claims_token_of_deleted_user_rejected(self):
+        user = User.objects.create_user(username='gone',
+                                        email='gone@gmail.com',
+                                        role=AUTHOR_ROLE)
+        client = self.claims_client(user)
+        user.delete()
+        response = client.post(reverse('tasks-list'),
+                               {'title': 'title', 'price': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_refresh_reads_claims_from_db(self):
+        url = reverse('emailconfirm-token-refresh')
+        refresh = str(ClaimsRefreshToken.for_user(self.author))
+        User.objects.filter(pk=self.author.pk).update(role=EXECUTOR_ROLE)
+        response = APIClient().post(url, {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["token"]}')
+        response = client.get(self.USER_CHANGE_DATA_URL)
+        self.assertEqual(response.data['role'], EXECUTOR_ROLE)
+
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+        response = APIClient().post(url, {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_claims_user_needs_shared_cache(self):
+        self.assertEqual(check_claims_cache(None), [])
+        with self.settings(SHARED_CACHE='default'):
+            self.assertEqual([error.id for error in check_claims_cache(None)],
+                             ['users.E001'])
+            with self.settings(JWT_CLAIMS_USER=False):
+                self.assertEqual(check_claims_cache(None), [])
+
+    def test_me_needs_shared_cache(self):
+        self.assertEqual(check_me_cache(None), [])
+        with self.settings(SHARED_CACHE='default'):
+            self.assertEqual([error.id for error in check_me_cache(None)],
+                             ['users.E002'])
@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
+from tasks.admin import ImportAdminMixin
+
 User = get_user_model()
 
 
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(ImportAdminMixin, admin.ModelAdmin):
+    import_kind = 'users'
     list_display = (
         'id',
         'first_name',
@@ -15,6 +18,9 @@ class UserAdmin(admin.ModelAdmin):
         'freeze_balance',
         'role',
     )
+    # Деньги двигаются только через tasks.ledger: правка баланса здесь
+    # не попала бы в журнал.
+    readonly_fields = ('balance', 'freeze_balance')
 
 
 admin.site.register(User, UserAdmin)
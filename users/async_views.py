@@ -0,0 +1,14 @@
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+
+from tasks.async_views import async_read_view
+from users.cache import get_me
+from users.serializers import MeSerializer
+
+User = get_user_model()
+
+
+@async_read_view
+def me(request):
+    return get_me(request.user.id, lambda: MeSerializer(
+        get_object_or_404(User, id=request.user.id)).data)
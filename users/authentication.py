@@ -0,0 +1,104 @@
+"""JWT-аутентификация без чтения пользователя из БД.
+
+Токены, выданные ClaimsRefreshToken, несут role, is_active и is_staff;
+по ним запрос получает ClaimsUser и проверки прав обходятся без SELECT.
+Токены без этих claims (выданные раньше) проверяются по БД, как у
+JWTAuthentication.
+
+Access-токен живёт недолго, refresh_access_token выдаёт новый с claims
+из БД. Деактивация, смена роли или удаление пользователя пишет в общий
+кэш (freelance1.caches) отметку отзыва: access-токены, выпущенные до
+неё, больше не принимаются.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken, TokenError)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from freelance1.caches import shared_cache
+from users.models import User, UserRole
+
+CLAIM_FIELDS = User.TOKEN_CLAIM_FIELDS
+ISSUED_AT_CLAIM = 'iat'
+REVOKED_KEY = 'users:revoked:{}'
+
+
+def revoke_tokens(user_id):
+    """Отзывает все токены пользователя, выпущенные до этого момента."""
+    # Отметка живёт столько же, сколько access-токен, выпущенный до неё.
+    timeout = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    caches[settings.SHARED_CACHE].set(REVOKED_KEY.format(user_id),
+                                      time.time(), timeout)
+
+
+def is_revoked(token):
+    revoked_at = shared_cache('JWT_CLAIMS_USER').get(REVOKED_KEY.format(
+        token[api_settings.USER_ID_CLAIM]))
+    return revoked_at is not None and (
+        token.get(ISSUED_AT_CLAIM, 0) < revoked_at)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ISSUED_AT_CLAIM] = time.time()
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        return token
+
+
+def refresh_access_token(raw_token):
+    """Новый access-токен по refresh-токену с claims, прочитанными из БД."""
+    try:
+        refresh = ClaimsRefreshToken(raw_token)
+    except TokenError as error:
+        raise InvalidToken(error.args[0])
+    user = User.objects.filter(
+        pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+    if user is None:
+        raise AuthenticationFailed('User not found or inactive',
+                                   code='user_not_found')
+    return ClaimsRefreshToken.for_user(user).access_token
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь, собранный из claims access-токена."""
+
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    @cached_property
+    def is_active(self):
+        return self.token['is_active']
+
+    @property
+    def is_author(self):
+        return self.role == UserRole.AUTHOR
+
+    @property
+    def is_executor(self):
+        return self.role == UserRole.EXECUTOR
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if not settings.JWT_CLAIMS_USER or any(
+                field not in validated_token for field in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+        if is_revoked(validated_token):
+            raise AuthenticationFailed('Token has been revoked',
+                                       code='token_revoked')
+        user = ClaimsUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return user
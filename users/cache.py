@@ -0,0 +1,42 @@
+"""Кэш профиля /users/v1/users/me/.
+
+Профиль (балансы, открытые задачи, последние транзакции) кладётся
+целиком в общий кэш (freelance1.caches), чтобы инвалидацию видели все
+воркеры, и живёт до неё: её вызывают журнал денег, запись Transaction
+и изменения пользователя. Ключ удаляется
+сразу и ещё раз после коммита, чтобы параллельный запрос не вернул в
+кэш данные, прочитанные до коммита. По той же причине промах читается
+с primary, а не с отстающей реплики.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from freelance1.caches import shared_cache
+from freelance1.replicas import use_primary
+
+ME_KEY = 'users:me:{}'
+
+
+def me_key(user_id):
+    return ME_KEY.format(user_id)
+
+
+def get_me(user_id, build):
+    """Профиль из кэша; при промахе строит его через build()."""
+    key = me_key(user_id)
+    cache = shared_cache('ME cache')
+    data = cache.get(key)
+    if data is None:
+        with use_primary():
+            data = build()
+        cache.set(key, data, settings.ME_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_me(*user_ids):
+    keys = [me_key(user_id) for user_id in set(user_ids)
+            if user_id is not None]
+    if keys:
+        cache = shared_cache('ME cache')
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.exceptions import ImproperlyConfigured
+
+from freelance1.caches import shared_cache
+
+
+@register()
+def check_claims_cache(app_configs, **kwargs):
+    # Без общего кэша отзыв токена виден только одному процессу.
+    if not settings.JWT_CLAIMS_USER:
+        return []
+    try:
+        shared_cache('JWT_CLAIMS_USER')
+    except ImproperlyConfigured as error:
+        return [Error(str(error), hint='Set SHARED_CACHE to a cache shared '
+                      'between processes or disable JWT_CLAIMS_USER.',
+                      id='users.E001')]
+    return []
+
+
+@register()
+def check_me_cache(app_configs, **kwargs):
+    # Иначе инвалидация профиля /me видна только одному процессу.
+    try:
+        shared_cache('ME cache')
+    except ImproperlyConfigured as error:
+        return [Error(str(error), hint='Set SHARED_CACHE to a cache shared '
+                      'between processes.', id='users.E002')]
+    return []
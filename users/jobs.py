@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+
+from jobs.queue import handler
+
+User = get_user_model()
+
+
+@handler('users.send_confirmation_code')
+def send_confirmation_code(user_id):
+    # Код строится в момент отправки, чтобы не хранить его в очереди.
+    user = User.objects.get(pk=user_id)
+    token = default_token_generator.make_token(user)
+    send_mail('Confirmation code',
+              f'Используйте этот код для получения доступа: {token}',
+              settings.NOREPLY_FREELANCE1_EMAIL,
+              [user.email])
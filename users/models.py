@@ -13,7 +13,27 @@ class UserRole(models.TextChoices):
     EXECUTOR = 'executor'
 
 
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Поля из claims, изменённые в обход save(), тоже отзывают токены.
+        if not set(kwargs) & set(User.TOKEN_CLAIM_FIELDS):
+            return super().update(**kwargs)
+        from users.authentication import revoke_tokens
+        ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        for user_id in ids:
+            revoke_tokens(user_id)
+        return rows
+
+
+class UserTokenManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractBaseUser):
+    # Поля, которые попадают в claims access-токена.
+    TOKEN_CLAIM_FIELDS = ('role', 'is_active', 'is_staff')
+
     first_name = models.CharField('First name', max_length=30, blank=True)
     last_name = models.CharField('Last name', max_length=30, blank=True)
     username = models.CharField('Username', max_length=25, unique=True)
@@ -50,7 +70,7 @@ class User(AbstractBaseUser):
         ),
     )
     username_validator = UnicodeUsernameValidator()
-    objects = UserManager()
+    objects = UserTokenManager()
     date_joined = models.DateTimeField(_('date joined'), default=timezone.now)
     USERNAME_FIELD = 'username'
 
@@ -65,6 +85,16 @@ class User(AbstractBaseUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_claims = instance.token_claims()
+        return instance
+
+    def token_claims(self):
+        return {field: self.__dict__.get(field)
+                for field in self.TOKEN_CLAIM_FIELDS}
+
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
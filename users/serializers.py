@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
 from rest_framework import serializers
 
+from tasks.models import Task, TaskStatuses, Transaction
+from tasks.serializers import TransactionSerializer
+
 User = get_user_model()
 
 
@@ -11,6 +15,31 @@ class UserSerializer(serializers.ModelSerializer):
                   'email', 'role', 'balance', 'freeze_balance')
 
 
+class MeSerializer(UserSerializer):
+    """Профиль текущего пользователя для /users/me."""
+    RECENT_TRANSACTIONS = 5
+
+    open_tasks = serializers.SerializerMethodField()
+    recent_transactions = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('open_tasks',
+                                               'recent_transactions')
+
+    def get_open_tasks(self, user):
+        return Task.objects.filter(
+            Q(author=user) | Q(executor=user)
+        ).exclude(status=TaskStatuses.DONE).aggregate(
+            author=Count('id', filter=Q(author=user)),
+            executor=Count('id', filter=Q(executor=user)))
+
+    def get_recent_transactions(self, user):
+        transactions = Transaction.objects.filter(
+            Q(author=user) | Q(executor=user)
+        )[:self.RECENT_TRANSACTIONS]
+        return TransactionSerializer(transactions, many=True).data
+
+
 class BalanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -29,3 +58,7 @@ class EmailSerializer(serializers.Serializer):
 class CodeSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
     confirmation_code = serializers.CharField(required=True)
+
+
+class RefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=True)
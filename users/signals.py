@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import revoke_tokens
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def revoke_stale_tokens(sender, instance, created, **kwargs):
+    # role, is_active и is_staff зашиты в выданные токены,
+    # поэтому их изменение делает эти токены недействительными.
+    claims = instance.token_claims()
+    saved = getattr(instance, '_saved_claims', None)
+    if not created and saved is not None and saved != claims:
+        revoke_tokens(instance.pk)
+    instance._saved_claims = claims
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    # Иначе токен удалённого пользователя ещё проходит по claims.
+    revoke_tokens(instance.pk)
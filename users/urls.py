@@ -2,6 +2,7 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import EmailConfirm, UsersViewSet
 
 router_v1 = DefaultRouter()
@@ -9,5 +10,6 @@ router_v1.register('users', UsersViewSet, basename='users')
 router_v1.register('auth', EmailConfirm, basename='emailconfirm')
 
 urlpatterns = [
+    path('v1/async/users/me/', async_views.me, name='async-users-me'),
     path('v1/', include(router_v1.urls)),
 ]
@@ -2,16 +2,22 @@ from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import ProtectedError
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from freelance1.settings import NOREPLY_FREELANCE1_EMAIL
-from users.serializers import EmailSerializer, CodeSerializer, UserSerializer, BalanceSerializer
+from jobs.queue import enqueue
+from tasks import ledger
+from users.authentication import ClaimsRefreshToken, refresh_access_token
+from users.cache import get_me, invalidate_me
+from users.serializers import (EmailSerializer, CodeSerializer, MeSerializer,
+                               RefreshSerializer, UserSerializer,
+                               BalanceSerializer)
 
 User = get_user_model()
 
@@ -22,29 +28,51 @@ class UsersViewSet(viewsets.ModelViewSet):
     lookup_field = 'id'
     permission_classes = (IsAdminUser,)
 
+    def perform_create(self, serializer):
+        # Стартовые балансы приходят извне и тоже заводятся в журнал.
+        with transaction.atomic():
+            user = serializer.save()
+            ledger.adjust(user.id, user.balance, user.freeze_balance)
+
+    def perform_update(self, serializer):
+        balance = serializer.instance.balance
+        freeze_balance = serializer.instance.freeze_balance
+        with transaction.atomic():
+            user = serializer.save()
+            ledger.adjust(user.id, user.balance - balance,
+                          user.freeze_balance - freeze_balance)
+            invalidate_me(user.id)
+
+    def perform_destroy(self, instance):
+        try:
+            instance.delete()
+        except ProtectedError:
+            raise ValidationError('User has ledger entries and cannot be '
+                                  'deleted; deactivate them instead')
+
     @action(detail=False,
             methods=['get', 'patch'],
             permission_classes=(IsAuthenticated,))
     def me(self, request):
-        user = get_object_or_404(User, id=request.user.id)
         if request.method == 'GET':
-            serializer = self.get_serializer(user)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            data = get_me(request.user.id, lambda: MeSerializer(
+                get_object_or_404(User, id=request.user.id)).data)
+            return Response(data, status=status.HTTP_200_OK)
+        user = get_object_or_404(User, id=request.user.id)
         serializer = self.get_serializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save(role=user.role, balance=user.balance,
                         freeze_balance=user.freeze_balance)
+        invalidate_me(user.id)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False,
             methods=['patch'],
             permission_classes=(IsAuthenticated,))
     def balance(self, request):
-        user = get_object_or_404(User, id=request.user.id)
         serializer = BalanceSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user.balance += Decimal(serializer.data['balance'])
-        user.save()
+        ledger.deposit(request.user.id, Decimal(serializer.data['balance']))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -60,14 +88,7 @@ class EmailConfirm(viewsets.ViewSet):
             email=serializer.data['email'],
             role=serializer.data['role'],
         )
-        token = default_token_generator.make_token(user)
-        mail_subject = 'Confirmation code'
-        message = f'Используйте этот код для получения доступа: {token}'
-        send_mail(mail_subject,
-                  message,
-                  NOREPLY_FREELANCE1_EMAIL,
-                  [user.email]
-                  )
+        enqueue('users.send_confirmation_code', user_id=user.id)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False,
@@ -80,7 +101,17 @@ class EmailConfirm(viewsets.ViewSet):
             User, email=serializer.data['email'])
         code = serializer.data['confirmation_code']
         if default_token_generator.check_token(user, code):
-            token = RefreshToken.for_user(user)
-            return Response({'token': f'{token.access_token}'},
+            token = ClaimsRefreshToken.for_user(user)
+            return Response({'token': f'{token.access_token}',
+                             'refresh': f'{token}'},
                             status=status.HTTP_200_OK)
         return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False,
+            methods=['post'],
+            url_path='token/refresh')
+    def token_refresh(self, request):
+        serializer = RefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = refresh_access_token(serializer.data['refresh'])
+        return Response({'token': f'{token}'}, status=status.HTTP_200_OK)